@@ -0,0 +1,14 @@
+from typing import Annotated
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_async_db
+from app.core.security import get_current_user, get_current_verified_user
+from app.models.models import User
+
+# Annotated dependency aliases: declared once so endpoint signatures stay
+# short and FastAPI reuses the same cached dependency within a request
+DB = Annotated[Session, Depends(get_db)]
+AsyncDB = Annotated[AsyncSession, Depends(get_async_db)]
+CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentVerifiedUser = Annotated[User, Depends(get_current_verified_user)]
@@ -1,4 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+import asyncio
+import json
 from app.core.security import get_current_verified_user
 from app.models.models import User
 from app.schemas.schemas import (
@@ -7,6 +10,7 @@ from app.schemas.schemas import (
     EmailOptimizationRequest, EmailOptimizationResponse
 )
 from app.services.ai_service import AIService
+from app.services.ai_batcher import subject_line_batcher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,13 +18,77 @@ router = APIRouter()
 
 ai_service = AIService()
 
+# Static advisory payloads serialized once at import time; the handlers
+# return the cached bytes instead of rebuilding and re-encoding per request
+_STATIC_ENGAGEMENT_INSIGHTS = json.dumps({
+    "best_performing_elements": [
+        "Subject line contains urgency",
+        "Personalized greeting increased opens by 23%",
+        "Call-to-action button placement optimal"
+    ],
+    "improvement_suggestions": [
+        "Try sending at 10 AM local time for better open rates",
+        "Segment audience by engagement level",
+        "A/B test shorter subject lines"
+    ],
+    "predicted_improvements": {
+        "open_rate": "+15%",
+        "click_rate": "+8%",
+        "conversion_rate": "+5%"
+    }
+}).encode()
+
+_STATIC_SEGMENTS = json.dumps({
+    "segments": [
+        {
+            "name": "Highly Engaged",
+            "criteria": "Opened >80% of emails in last 30 days",
+            "size": 150,
+            "recommendations": ["Send exclusive offers", "Request testimonials"]
+        },
+        {
+            "name": "Re-engagement Needed",
+            "criteria": "No opens in last 60 days",
+            "size": 75,
+            "recommendations": ["Send win-back campaign", "Update preferences survey"]
+        },
+        {
+            "name": "New Subscribers",
+            "criteria": "Subscribed within last 14 days",
+            "size": 45,
+            "recommendations": ["Welcome series", "Onboarding content"]
+        }
+    ]
+}).encode()
+
+_STATIC_SEND_TIME_PREDICTIONS = json.dumps({
+    "global_best_time": "Tuesday, 10:00 AM",
+    "timezone_recommendations": [
+        {"timezone": "America/New_York", "best_time": "10:00 AM EST"},
+        {"timezone": "America/Los_Angeles", "best_time": "11:00 AM PST"},
+        {"timezone": "Europe/London", "best_time": "2:00 PM GMT"}
+    ],
+    "day_of_week_analysis": {
+        "Monday": 0.72,
+        "Tuesday": 0.89,
+        "Wednesday": 0.85,
+        "Thursday": 0.83,
+        "Friday": 0.65,
+        "Saturday": 0.45,
+        "Sunday": 0.38
+    },
+    "confidence_score": 0.87
+}).encode()
+
 @router.post("/generate-subject-lines", response_model=SubjectLineResponse)
 async def generate_subject_lines(
     request: SubjectLineRequest,
     current_user: User = Depends(get_current_verified_user)
 ):
     try:
-        suggestions = ai_service.generate_subject_lines(
+        # Concurrent requests are coalesced by the batch scheduler instead
+        # of issuing one upstream call per HTTP request
+        suggestions = await subject_line_batcher.generate_subject_lines(
             content=request.content,
             tone=request.tone,
             industry=request.industry,
@@ -40,7 +108,7 @@ async def generate_subject_lines(
             analysis=analysis
         )
     except Exception as e:
-        logger.error(f"Failed to generate subject lines: {e}")
+        logger.error("Failed to generate subject lines: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate subject lines"
@@ -52,7 +120,8 @@ async def generate_email_content(
     current_user: User = Depends(get_current_verified_user)
 ):
     try:
-        content = ai_service.generate_email_content(
+        content = await asyncio.to_thread(
+            ai_service.generate_email_content,
             purpose=request.purpose,
             tone=request.tone,
             length=request.length,
@@ -60,9 +129,11 @@ async def generate_email_content(
             call_to_action=request.call_to_action,
             personalization_fields=request.personalization_fields
         )
-        
-        # Generate subject suggestions for the content
-        subject_suggestions = ai_service.generate_subject_lines(
+
+        # Generate subject suggestions for the content (depends on content,
+        # so it can't overlap the first call, but it must not block the loop)
+        subject_suggestions = await asyncio.to_thread(
+            ai_service.generate_subject_lines,
             content=content,
             tone=request.tone
         )
@@ -80,7 +151,7 @@ async def generate_email_content(
             optimization_tips=optimization_tips
         )
     except Exception as e:
-        logger.error(f"Failed to generate email content: {e}")
+        logger.error("Failed to generate email content: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate email content"
@@ -92,7 +163,8 @@ async def optimize_email(
     current_user: User = Depends(get_current_verified_user)
 ):
     try:
-        optimization = ai_service.optimize_email(
+        optimization = await asyncio.to_thread(
+            ai_service.optimize_email,
             subject=request.subject,
             content=request.content,
             target_audience=request.target_audience
@@ -105,7 +177,7 @@ async def optimize_email(
             optimized_content=optimization.get("optimized_content")
         )
     except Exception as e:
-        logger.error(f"Failed to optimize email: {e}")
+        logger.error("Failed to optimize email: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to optimize email"
@@ -116,101 +188,22 @@ async def analyze_engagement(
     campaign_id: int,
     current_user: User = Depends(get_current_verified_user)
 ):
-    try:
-        # This would analyze campaign performance and provide AI insights
-        insights = {
-            "best_performing_elements": [
-                "Subject line contains urgency",
-                "Personalized greeting increased opens by 23%",
-                "Call-to-action button placement optimal"
-            ],
-            "improvement_suggestions": [
-                "Try sending at 10 AM local time for better open rates",
-                "Segment audience by engagement level",
-                "A/B test shorter subject lines"
-            ],
-            "predicted_improvements": {
-                "open_rate": "+15%",
-                "click_rate": "+8%",
-                "conversion_rate": "+5%"
-            }
-        }
-        
-        return insights
-    except Exception as e:
-        logger.error(f"Failed to analyze engagement: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to analyze engagement"
-        )
+    # This would analyze campaign performance and provide AI insights
+    return Response(content=_STATIC_ENGAGEMENT_INSIGHTS, media_type="application/json")
 
 @router.post("/smart-segmentation")
 async def smart_segmentation(
     current_user: User = Depends(get_current_verified_user)
 ):
-    try:
-        # AI-powered contact segmentation suggestions
-        segments = [
-            {
-                "name": "Highly Engaged",
-                "criteria": "Opened >80% of emails in last 30 days",
-                "size": 150,
-                "recommendations": ["Send exclusive offers", "Request testimonials"]
-            },
-            {
-                "name": "Re-engagement Needed",
-                "criteria": "No opens in last 60 days",
-                "size": 75,
-                "recommendations": ["Send win-back campaign", "Update preferences survey"]
-            },
-            {
-                "name": "New Subscribers",
-                "criteria": "Subscribed within last 14 days",
-                "size": 45,
-                "recommendations": ["Welcome series", "Onboarding content"]
-            }
-        ]
-        
-        return {"segments": segments}
-    except Exception as e:
-        logger.error(f"Failed to create smart segmentation: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create smart segmentation"
-        )
+    # AI-powered contact segmentation suggestions
+    return Response(content=_STATIC_SEGMENTS, media_type="application/json")
 
 @router.post("/predict-best-send-time")
 async def predict_best_send_time(
     campaign_id: int,
     current_user: User = Depends(get_current_verified_user)
 ):
-    try:
-        # AI prediction for optimal send times
-        predictions = {
-            "global_best_time": "Tuesday, 10:00 AM",
-            "timezone_recommendations": [
-                {"timezone": "America/New_York", "best_time": "10:00 AM EST"},
-                {"timezone": "America/Los_Angeles", "best_time": "11:00 AM PST"},
-                {"timezone": "Europe/London", "best_time": "2:00 PM GMT"}
-            ],
-            "day_of_week_analysis": {
-                "Monday": 0.72,
-                "Tuesday": 0.89,
-                "Wednesday": 0.85,
-                "Thursday": 0.83,
-                "Friday": 0.65,
-                "Saturday": 0.45,
-                "Sunday": 0.38
-            },
-            "confidence_score": 0.87
-        }
-        
-        return predictions
-    except Exception as e:
-        logger.error(f"Failed to predict send time: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to predict send time"
-        )
+    # AI prediction for optimal send times
+    return Response(content=_STATIC_SEND_TIME_PREDICTIONS, media_type="application/json")
 
 ai_router = router
\ No newline at end of file
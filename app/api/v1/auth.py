@@ -1,37 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import time
+from app.core.database import get_async_db
 from app.core.security import (
-    verify_password, get_password_hash, create_access_token, 
+    verify_and_update_password, get_password_hash, create_access_token,
     create_refresh_token, decode_token, generate_verification_token,
     create_password_reset_token, verify_password_reset_token
 )
+from app.core.redis import redis_client, user_cache_key
 from app.models.models import User
 from app.schemas.schemas import (
     UserCreate, User as UserSchema, Token, LoginRequest
 )
-from app.services.email_service import EmailService
+from app.services.email_tasks import send_verification_email, send_password_reset_email
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Negative TTL cache for /forgot-password so repeated probes for unknown
+# emails (enumeration attempts) don't round-trip the database
+_UNKNOWN_EMAIL_TTL_SECONDS = 300
+_unknown_email_cache = {}
+
+def _unknown_email_cached(email: str) -> bool:
+    expires_at = _unknown_email_cache.get(email)
+    if expires_at is None:
+        return False
+    if expires_at < time.monotonic():
+        del _unknown_email_cache[email]
+        return False
+    return True
+
+def _cache_unknown_email(email: str):
+    # Drop expired entries opportunistically to keep the cache bounded
+    if len(_unknown_email_cache) > 10000:
+        now = time.monotonic()
+        for key in [k for k, v in _unknown_email_cache.items() if v < now]:
+            del _unknown_email_cache[key]
+    _unknown_email_cache[email] = time.monotonic() + _UNKNOWN_EMAIL_TTL_SECONDS
+
 @router.post("/register", response_model=UserSchema)
 async def register(
     user_data: UserCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(
+        select(User).where(User.email == user_data.email)
+    )).scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user (bcrypt is CPU-heavy, keep it off the event loop)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -40,46 +67,61 @@ async def register(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
-    # Send verification email
-    email_service = EmailService()
+    # Send verification email via the worker queue so SMTP latency never
+    # ties up this web process
     verification_token = generate_verification_token()
     # Store token in cache/db for verification
-    
-    background_tasks.add_task(
-        email_service.send_verification_email,
-        user_data.email,
-        verification_token
-    )
-    
+
+    send_verification_email.delay(user_data.email, verification_token)
+
     return db_user
 
 @router.post("/login", response_model=Token)
 async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Authenticate user
-    user = db.query(User).filter(User.email == login_data.email).first()
-    
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = (await db.execute(
+        select(User).where(User.email == login_data.email)
+    )).scalar_one_or_none()
+    
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await asyncio.to_thread(
+            verify_and_update_password, login_data.password, user.hashed_password
+        )
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
-    
+
+    # Transparently upgrade legacy bcrypt hashes to the current scheme
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        try:
+            await redis_client.delete(user_cache_key(user.id))
+        except Exception:
+            pass
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive"
         )
     
-    # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    
+    # Create tokens; signing runs in worker threads so the loop stays free
+    access_token, refresh_token = await asyncio.gather(
+        asyncio.to_thread(create_access_token, {"sub": str(user.id)}),
+        asyncio.to_thread(create_refresh_token, {"sub": str(user.id)})
+    )
+
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -89,7 +131,7 @@ async def login(
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
     refresh_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     payload = decode_token(refresh_token)
     
@@ -100,7 +142,9 @@ async def refresh_token(
         )
     
     user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = (await db.execute(
+        select(User).where(User.id == int(user_id))
+    )).scalar_one_or_none()
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -108,9 +152,11 @@ async def refresh_token(
             detail="User not found or inactive"
         )
     
-    # Create new tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    # Create new tokens; signing runs in worker threads so the loop stays free
+    access_token, new_refresh_token = await asyncio.gather(
+        asyncio.to_thread(create_access_token, {"sub": str(user.id)}),
+        asyncio.to_thread(create_refresh_token, {"sub": str(user.id)})
+    )
     
     return {
         "access_token": access_token,
@@ -121,7 +167,7 @@ async def refresh_token(
 @router.post("/verify-email")
 async def verify_email(
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verify token and update user
     # This would check against stored tokens in cache/db
@@ -132,31 +178,32 @@ async def verify_email(
 @router.post("/forgot-password")
 async def forgot_password(
     email: str,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == email).first()
-    
+    if _unknown_email_cached(email):
+        # Don't reveal if email exists
+        return {"message": "If the email exists, a reset link has been sent"}
+
+    user = (await db.execute(
+        select(User).where(User.email == email)
+    )).scalar_one_or_none()
+
     if not user:
+        _cache_unknown_email(email)
         # Don't reveal if email exists
         return {"message": "If the email exists, a reset link has been sent"}
     
     reset_token = create_password_reset_token(email)
-    
-    email_service = EmailService()
-    background_tasks.add_task(
-        email_service.send_password_reset_email,
-        email,
-        reset_token
-    )
-    
+
+    send_password_reset_email.delay(email, reset_token)
+
     return {"message": "If the email exists, a reset link has been sent"}
 
 @router.post("/reset-password")
 async def reset_password(
     token: str,
     new_password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     email = verify_password_reset_token(token)
     
@@ -166,7 +213,9 @@ async def reset_password(
             detail="Invalid or expired token"
         )
     
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(
+        select(User).where(User.email == email)
+    )).scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -174,7 +223,13 @@ async def reset_password(
             detail="User not found"
         )
     
-    user.hashed_password = get_password_hash(new_password)
-    db.commit()
-    
+    user.hashed_password = await asyncio.to_thread(get_password_hash, new_password)
+    await db.commit()
+
+    # Drop the cached auth snapshot so the old password state is not served
+    try:
+        await redis_client.delete(user_cache_key(user.id))
+    except Exception:
+        pass
+
     return {"message": "Password reset successfully"}
\ No newline at end of file
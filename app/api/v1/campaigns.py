@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy import and_, select, func, tuple_, insert, literal
 from typing import List, Optional
-from datetime import datetime
-from app.core.database import get_db
+import asyncio
+from app.core.database import get_async_db, AsyncSessionLocal
 from app.core.security import get_current_verified_user
 from app.models.models import User, Campaign, Contact, Email, CampaignStatus
 from app.schemas.schemas import (
@@ -13,49 +14,94 @@ from app.schemas.schemas import (
 from app.services.email_service import EmailService
 from app.services.ai_service import AIService
 from app.utils.validators import validate_campaign_recipients
+from app.utils.pagination import encode_cursor, decode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+async def enrich_campaign_with_ai(campaign_id: int, subject: str, content: str):
+    """Run AI optimization after the response went out; opens its own session"""
+    ai_service = AIService()
+    try:
+        optimization = await asyncio.to_thread(
+            ai_service.optimize_email, subject, content
+        )
+    except Exception as e:
+        logger.error("AI optimization failed: %s", e)
+        return
+
+    async with AsyncSessionLocal() as db:
+        campaign = (await db.execute(
+            select(Campaign).where(Campaign.id == campaign_id)
+        )).scalar_one_or_none()
+        if campaign:
+            campaign.ai_suggestions = optimization.get("improvements")
+            campaign.optimization_score = optimization.get("score", 0)
+            await db.commit()
+
+def _recipient_filters(
+    user_id: int,
+    contact_ids: Optional[List[int]],
+    tags: Optional[List[str]]
+):
+    filters = [Contact.user_id == user_id, Contact.status == "active"]
+    if contact_ids:
+        filters.append(Contact.id.in_(contact_ids))
+    elif tags:
+        filters.append(Contact.tags.contains(tags))
+    return filters
+
+async def get_owned_campaign(
+    campaign_id: int,
+    current_user: User = Depends(get_current_verified_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Campaign:
+    """User-scoped campaign lookup shared by the /{campaign_id} routes.
+
+    FastAPI caches dependency results per request, so the query runs once
+    however many routes or sub-dependencies ask for it, and the 404
+    handling lives in one place.
+    """
+    campaign = (await db.execute(
+        select(Campaign).where(
+            and_(
+                Campaign.id == campaign_id,
+                Campaign.user_id == current_user.id
+            )
+        )
+    )).scalar_one_or_none()
+
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+
+    return campaign
+
 @router.post("/", response_model=CampaignSchema)
 async def create_campaign(
     campaign_data: CampaignCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Validate recipients
-    if campaign_data.contact_ids:
-        recipients = db.query(Contact).filter(
-            and_(
-                Contact.user_id == current_user.id,
-                Contact.id.in_(campaign_data.contact_ids),
-                Contact.status == "active"
-            )
-        ).all()
-    elif campaign_data.tags:
-        recipients = db.query(Contact).filter(
-            and_(
-                Contact.user_id == current_user.id,
-                Contact.tags.contains(campaign_data.tags),
-                Contact.status == "active"
-            )
-        ).all()
-    else:
-        recipients = db.query(Contact).filter(
-            and_(
-                Contact.user_id == current_user.id,
-                Contact.status == "active"
-            )
-        ).all()
-    
+    # Validate recipients with a bare COUNT; the Email fan-out re-selects
+    # the IDs inside INSERT ... SELECT, so no contact data leaves the DB
+    recipients_count = (await db.execute(
+        select(func.count(Contact.id)).where(*_recipient_filters(
+            current_user.id, campaign_data.contact_ids, campaign_data.tags
+        ))
+    )).scalar()
+
     # Check contact limits
-    if not validate_campaign_recipients(current_user, len(recipients)):
+    if not validate_campaign_recipients(current_user, recipients_count):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Campaign exceeds your plan's contact limit"
         )
-    
+
     # Create campaign
     db_campaign = Campaign(
         user_id=current_user.id,
@@ -65,230 +111,196 @@ async def create_campaign(
         from_name=campaign_data.from_name or current_user.full_name,
         from_email=campaign_data.from_email or current_user.email,
         scheduled_at=campaign_data.scheduled_at,
-        recipients_count=len(recipients)
+        recipients_count=recipients_count
     )
-    
-    # Get AI suggestions
-    ai_service = AIService()
-    try:
-        optimization = ai_service.optimize_email(
-            campaign_data.subject,
-            campaign_data.content
-        )
-        db_campaign.ai_suggestions = optimization.get("improvements")
-        db_campaign.optimization_score = optimization.get("score", 0)
-    except Exception as e:
-        logger.error(f"AI optimization failed: {e}")
-    
+
     db.add(db_campaign)
-    db.commit()
-    db.refresh(db_campaign)
-    
-    # Create email records for recipients
-    for contact in recipients:
-        email = Email(
-            campaign_id=db_campaign.id,
-            contact_id=contact.id
+    await db.flush()
+
+    # Fan Email rows out in the same transaction: one INSERT ... SELECT
+    # that re-resolves the recipient set server-side, so no contact data
+    # round-trips through Python and /send can never observe a committed
+    # campaign without its pending rows
+    await db.execute(
+        insert(Email).from_select(
+            ["campaign_id", "contact_id"],
+            select(literal(db_campaign.id), Contact.id).where(
+                *_recipient_filters(
+                    current_user.id, campaign_data.contact_ids, campaign_data.tags
+                )
+            )
         )
-        db.add(email)
-    
-    db.commit()
-    
+    )
+
+    await db.commit()
+    await db.refresh(db_campaign)
+
+    # AI enrichment happens after the response went out
+    background_tasks.add_task(
+        enrich_campaign_with_ai,
+        db_campaign.id, db_campaign.subject, db_campaign.content
+    )
+
     return db_campaign
 
 @router.get("/", response_model=PaginatedResponse)
 async def get_campaigns(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[CampaignStatus] = None,
     search: Optional[str] = None,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Campaign).filter(Campaign.user_id == current_user.id)
-    
+    filters = [Campaign.user_id == current_user.id]
+
     if status:
-        query = query.filter(Campaign.status == status)
-    
+        filters.append(Campaign.status == status)
+
     if search:
-        query = query.filter(
-            or_(
-                Campaign.name.ilike(f"%{search}%"),
-                Campaign.subject.ilike(f"%{search}%")
-            )
+        # Single predicate over the expression ix_campaign_search_trgm
+        # covers, so the search runs off the trigram index
+        filters.append(
+            func.lower(Campaign.name)
+            .concat(' ').concat(func.lower(Campaign.subject))
+            .like(f"%{search.lower()}%")
         )
-    
-    total = query.count()
-    campaigns = query.order_by(Campaign.created_at.desc()).offset(skip).limit(limit).all()
-    
+
+    # Keyset pagination: seek straight to the cursor position instead of
+    # scanning and discarding OFFSET rows, so deep pages cost the same as
+    # page 1. The cursor predicate goes in a separate list so `total` keeps
+    # counting the whole filtered collection, not the rows past the cursor
+    page_filters = list(filters)
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            # `status` is shadowed by the query param here, use the raw code
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_filters.append(
+            tuple_(Campaign.created_at, Campaign.id) < tuple_(*position)
+        )
+
+    # Window-function count rides along with the page so the filters run
+    # once; load_only skips the large content column the listing never shows
+    rows = (await db.execute(
+        select(Campaign, func.count().over().label('total'))
+        .options(load_only(
+            Campaign.id, Campaign.name, Campaign.subject, Campaign.status,
+            Campaign.scheduled_at, Campaign.sent_at, Campaign.recipients_count,
+            Campaign.opens_count, Campaign.clicks_count,
+            Campaign.optimization_score, Campaign.created_at
+        ))
+        .where(*page_filters)
+        .order_by(Campaign.created_at.desc(), Campaign.id.desc())
+        .limit(limit)
+    )).all()
+
+    campaigns = [row.Campaign for row in rows]
+
+    if rows and not cursor:
+        total = rows[0].total
+    else:
+        # Cursored or empty page: the window counted only rows after the
+        # cursor, so count the base filters separately
+        total = (await db.execute(
+            select(func.count(Campaign.id)).where(*filters)
+        )).scalar()
+
+    next_cursor = None
+    if len(campaigns) == limit:
+        last = campaigns[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
     return PaginatedResponse(
         total=total,
         items=campaigns,
-        skip=skip,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor
     )
 
 @router.get("/{campaign_id}", response_model=CampaignSchema)
 async def get_campaign(
-    campaign_id: int,
-    current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    campaign: Campaign = Depends(get_owned_campaign)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     return campaign
 
 @router.put("/{campaign_id}", response_model=CampaignSchema)
 async def update_campaign(
-    campaign_id: int,
     campaign_update: CampaignUpdate,
-    current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    campaign: Campaign = Depends(get_owned_campaign),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     if campaign.status in [CampaignStatus.SENDING, CampaignStatus.SENT]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot update campaign that is sending or already sent"
         )
-    
+
     # Update fields
     update_data = campaign_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(campaign, field, value)
-    
-    # Re-optimize if content changed
+
+    # Re-optimize in the background if content changed
     if "subject" in update_data or "content" in update_data:
-        ai_service = AIService()
-        try:
-            optimization = ai_service.optimize_email(
-                campaign.subject,
-                campaign.content
-            )
-            campaign.ai_suggestions = optimization.get("improvements")
-            campaign.optimization_score = optimization.get("score", 0)
-        except Exception as e:
-            logger.error(f"AI optimization failed: {e}")
-    
-    campaign.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(campaign)
-    
+        background_tasks.add_task(
+            enrich_campaign_with_ai,
+            campaign.id, campaign.subject, campaign.content
+        )
+
+    await db.commit()
+    await db.refresh(campaign)
+
     return campaign
 
 @router.delete("/{campaign_id}")
 async def delete_campaign(
-    campaign_id: int,
-    current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    campaign: Campaign = Depends(get_owned_campaign),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     if campaign.status in [CampaignStatus.SENDING, CampaignStatus.SENT]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete campaign that is sending or already sent"
         )
-    
-    db.delete(campaign)
-    db.commit()
-    
+
+    await db.delete(campaign)
+    await db.commit()
+
     return {"message": "Campaign deleted successfully"}
 
 @router.post("/{campaign_id}/send")
 async def send_campaign(
-    campaign_id: int,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    campaign: Campaign = Depends(get_owned_campaign),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     if campaign.status != CampaignStatus.DRAFT:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Campaign must be in draft status to send"
         )
-    
+
     # Update campaign status
     campaign.status = CampaignStatus.SCHEDULED if campaign.scheduled_at else CampaignStatus.SENDING
-    db.commit()
-    
+    await db.commit()
+
     # Queue sending task
     email_service = EmailService()
     background_tasks.add_task(
         email_service.send_campaign,
-        campaign_id
+        campaign.id
     )
-    
+
     return {"message": "Campaign queued for sending"}
 
 @router.post("/{campaign_id}/test")
 async def send_test_email(
-    campaign_id: int,
     test_email: str,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    campaign: Campaign = Depends(get_owned_campaign)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     # Send test email
     email_service = EmailService()
     background_tasks.add_task(
@@ -296,28 +308,15 @@ async def send_test_email(
         campaign,
         test_email
     )
-    
+
     return {"message": "Test email sent"}
 
 @router.post("/{campaign_id}/duplicate", response_model=CampaignSchema)
 async def duplicate_campaign(
-    campaign_id: int,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    campaign: Campaign = Depends(get_owned_campaign),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    campaign = db.query(Campaign).filter(
-        and_(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user.id
-        )
-    ).first()
-    
-    if not campaign:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Campaign not found"
-        )
-    
     # Create duplicate
     new_campaign = Campaign(
         user_id=current_user.id,
@@ -328,9 +327,9 @@ async def duplicate_campaign(
         from_email=campaign.from_email,
         status=CampaignStatus.DRAFT
     )
-    
+
     db.add(new_campaign)
-    db.commit()
-    db.refresh(new_campaign)
-    
-    return new_campaign
\ No newline at end of file
+    await db.commit()
+    await db.refresh(new_campaign)
+
+    return new_campaign
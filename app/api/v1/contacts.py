@@ -1,123 +1,188 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy import and_, func, select, tuple_, exists, cast, update, distinct, JSON
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from typing import List, Optional
 import csv
 import io
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_verified_user
 from app.models.models import User, Contact, ContactStatus
 from app.schemas.schemas import (
     ContactCreate, ContactUpdate, Contact as ContactSchema,
     ContactImport, PaginatedResponse
 )
-from app.utils.validators import validate_contact_limit
+from app.utils.validators import validate_contact_limit, validate_email_format_batch
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.core.redis import redis_client, contact_count_key
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+async def invalidate_contact_count(user_id: int):
+    """Drop the cached contact count after anything changes the total"""
+    try:
+        await redis_client.delete(contact_count_key(user_id))
+    except Exception as e:
+        logger.warning("Contact count invalidation failed: %s", e)
+
+async def email_exists(db: AsyncSession, user_id: int, email: str) -> bool:
+    # EXISTS short-circuits on the (user_id, email) unique index without
+    # fetching or constructing a full ORM row
+    return (await db.execute(
+        select(exists().where(
+            and_(
+                Contact.user_id == user_id,
+                Contact.email == email
+            )
+        ))
+    )).scalar()
+
 @router.post("/", response_model=ContactSchema)
 async def create_contact(
     contact_data: ContactCreate,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check contact limit
-    current_count = db.query(Contact).filter(
-        Contact.user_id == current_user.id
-    ).count()
-    
+    current_count = (await db.execute(
+        select(func.count(Contact.id)).where(Contact.user_id == current_user.id)
+    )).scalar()
+
     if not validate_contact_limit(current_user, current_count + 1):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Contact limit reached for your plan"
         )
-    
-    # Check if contact already exists
-    existing = db.query(Contact).filter(
-        and_(
-            Contact.user_id == current_user.id,
-            Contact.email == contact_data.email
-        )
-    ).first()
-    
-    if existing:
+
+    # Create contact; the (user_id, email) unique constraint deduplicates in
+    # the same statement, closing the SELECT-then-INSERT race window
+    new_id = (await db.execute(
+        pg_insert(Contact)
+        .values(user_id=current_user.id, **contact_data.dict())
+        .on_conflict_do_nothing(index_elements=['user_id', 'email'])
+        .returning(Contact.id)
+    )).scalar_one_or_none()
+
+    if new_id is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contact with this email already exists"
         )
-    
-    # Create contact
-    db_contact = Contact(
-        user_id=current_user.id,
-        **contact_data.dict()
-    )
-    
-    db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
-    
-    return db_contact
+
+    await db.commit()
+    await invalidate_contact_count(current_user.id)
+
+    return (await db.execute(
+        select(Contact).where(Contact.id == new_id)
+    )).scalar_one()
 
 @router.get("/", response_model=PaginatedResponse)
 async def get_contacts(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[ContactStatus] = None,
     tags: Optional[List[str]] = Query(None),
     search: Optional[str] = None,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Contact).filter(Contact.user_id == current_user.id)
-    
+    filters = [Contact.user_id == current_user.id]
+
     if status:
-        query = query.filter(Contact.status == status)
-    
+        filters.append(Contact.status == status)
+
     if tags:
-        for tag in tags:
-            query = query.filter(Contact.tags.contains([tag]))
-    
+        # One GIN-indexed @> "contains all" probe instead of a filter per tag
+        filters.append(cast(Contact.tags, JSONB).op('@>')(cast(tags, JSONB)))
+
     if search:
-        query = query.filter(
-            or_(
-                Contact.email.ilike(f"%{search}%"),
-                Contact.first_name.ilike(f"%{search}%"),
-                Contact.last_name.ilike(f"%{search}%"),
-                Contact.company.ilike(f"%{search}%")
-            )
+        # Single predicate over the expression ix_contact_search_trgm
+        # covers, so the search runs off the trigram index
+        filters.append(
+            func.lower(Contact.email)
+            .concat(' ').concat(func.coalesce(func.lower(Contact.first_name), ''))
+            .concat(' ').concat(func.coalesce(func.lower(Contact.last_name), ''))
+            .concat(' ').concat(func.coalesce(func.lower(Contact.company), ''))
+            .like(f"%{search.lower()}%")
+        )
+
+    # Keyset pagination: seek straight to the cursor position instead of
+    # scanning and discarding OFFSET rows, so deep pages cost the same as
+    # page 1. The cursor predicate goes in a separate list so `total` keeps
+    # counting the whole filtered collection, not the rows past the cursor
+    page_filters = list(filters)
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            # `status` is shadowed by the query param here, use the raw code
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_filters.append(
+            tuple_(Contact.created_at, Contact.id) < tuple_(*position)
         )
-    
-    total = query.count()
-    contacts = query.order_by(Contact.created_at.desc()).offset(skip).limit(limit).all()
-    
+
+    # Window-function count rides along with the page so the filters run
+    # once; load_only skips the custom_fields JSON the listing never shows
+    rows = (await db.execute(
+        select(Contact, func.count().over().label('total'))
+        .options(load_only(
+            Contact.id, Contact.email, Contact.first_name, Contact.last_name,
+            Contact.company, Contact.tags, Contact.status,
+            Contact.engagement_score, Contact.created_at
+        ))
+        .where(*page_filters)
+        .order_by(Contact.created_at.desc(), Contact.id.desc())
+        .limit(limit)
+    )).all()
+
+    contacts = [row.Contact for row in rows]
+
+    if rows and not cursor:
+        total = rows[0].total
+    else:
+        # Cursored or empty page: the window counted only rows after the
+        # cursor, so count the base filters separately
+        total = (await db.execute(
+            select(func.count(Contact.id)).where(*filters)
+        )).scalar()
+
+    next_cursor = None
+    if len(contacts) == limit:
+        last = contacts[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
     return PaginatedResponse(
         total=total,
         items=contacts,
-        skip=skip,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor
     )
 
 @router.get("/{contact_id}", response_model=ContactSchema)
 async def get_contact(
     contact_id: int,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    contact = db.query(Contact).filter(
-        and_(
-            Contact.id == contact_id,
-            Contact.user_id == current_user.id
+    contact = (await db.execute(
+        select(Contact).where(
+            and_(
+                Contact.id == contact_id,
+                Contact.user_id == current_user.id
+            )
         )
-    ).first()
-    
+    )).scalar_one_or_none()
+
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    
+
     return contact
 
 @router.put("/{contact_id}", response_model=ContactSchema)
@@ -125,69 +190,66 @@ async def update_contact(
     contact_id: int,
     contact_update: ContactUpdate,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    contact = db.query(Contact).filter(
-        and_(
-            Contact.id == contact_id,
-            Contact.user_id == current_user.id
+    contact = (await db.execute(
+        select(Contact).where(
+            and_(
+                Contact.id == contact_id,
+                Contact.user_id == current_user.id
+            )
         )
-    ).first()
-    
+    )).scalar_one_or_none()
+
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    
+
     # Check if email is being changed and already exists
     if contact_update.email and contact_update.email != contact.email:
-        existing = db.query(Contact).filter(
-            and_(
-                Contact.user_id == current_user.id,
-                Contact.email == contact_update.email
-            )
-        ).first()
-        
-        if existing:
+        if await email_exists(db, current_user.id, contact_update.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Contact with this email already exists"
             )
-    
+
     # Update fields
     update_data = contact_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(contact, field, value)
-    
-    contact.updated_at = func.now()
-    db.commit()
-    db.refresh(contact)
-    
+
+    await db.commit()
+    await db.refresh(contact)
+
     return contact
 
 @router.delete("/{contact_id}")
 async def delete_contact(
     contact_id: int,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    contact = db.query(Contact).filter(
-        and_(
-            Contact.id == contact_id,
-            Contact.user_id == current_user.id
+    contact = (await db.execute(
+        select(Contact).where(
+            and_(
+                Contact.id == contact_id,
+                Contact.user_id == current_user.id
+            )
         )
-    ).first()
-    
+    )).scalar_one_or_none()
+
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    
-    db.delete(contact)
-    db.commit()
-    
+
+    await db.delete(contact)
+    await db.commit()
+    await invalidate_contact_count(current_user.id)
+
     return {"message": "Contact deleted successfully"}
 
 @router.post("/import")
@@ -195,7 +257,7 @@ async def import_contacts(
     file: UploadFile = File(...),
     update_existing: bool = False,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Validate file type
     if not file.filename.endswith('.csv'):
@@ -203,79 +265,128 @@ async def import_contacts(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only CSV files are supported"
         )
-    
-    # Read CSV
-    contents = await file.read()
-    csv_reader = csv.DictReader(io.StringIO(contents.decode('utf-8')))
-    
+
+    # Parse the CSV in the threadpool, streaming straight from the upload's
+    # spooled file instead of buffering the raw bytes and decoding on the
+    # event loop. The parsed rows are kept because the duplicate pre-load
+    # below needs a full pass over the emails before inserting.
+    def parse_csv():
+        reader = csv.DictReader(
+            io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+        )
+        return list(reader)
+
+    rows = await run_in_threadpool(parse_csv)
+
+    # One multiline regex sweep over every email in the file instead of a
+    # per-row validation call; indexed by row position below
+    row_emails = [row.get('email', '').strip().lower() for row in rows]
+    email_valid = validate_email_format_batch(row_emails)
+
     imported = 0
     updated = 0
     errors = []
-    
+
     # Check total limit
-    current_count = db.query(Contact).filter(
-        Contact.user_id == current_user.id
-    ).count()
-    
-    for row_num, row in enumerate(csv_reader, start=2):
+    current_count = (await db.execute(
+        select(func.count(Contact.id)).where(Contact.user_id == current_user.id)
+    )).scalar()
+
+    # Pre-load existing contacts for every email in the file with one IN
+    # query instead of a SELECT per CSV row
+    emails_in_file = {
+        row.get('email', '').strip().lower()
+        for row in rows if row.get('email', '').strip()
+    }
+    existing_by_email = {}
+    if emails_in_file:
+        existing_by_email = {
+            contact.email: contact
+            for contact in (await db.execute(
+                select(Contact).where(
+                    and_(
+                        Contact.user_id == current_user.id,
+                        Contact.email.in_(emails_in_file)
+                    )
+                )
+            )).scalars()
+        }
+
+    to_insert = []
+    seen_emails = set()
+
+    for row_num, row in enumerate(rows, start=2):
         try:
-            email = row.get('email', '').strip().lower()
+            email = row_emails[row_num - 2]
             if not email:
                 errors.append(f"Row {row_num}: Missing email")
                 continue
-            
-            # Check if contact exists
-            existing = db.query(Contact).filter(
-                and_(
-                    Contact.user_id == current_user.id,
-                    Contact.email == email
-                )
-            ).first()
-            
+
+            if not email_valid[row_num - 2]:
+                errors.append(f"Row {row_num}: Invalid email format")
+                continue
+
+            existing = existing_by_email.get(email)
             if existing:
                 if update_existing:
                     # Update existing contact
                     existing.first_name = row.get('first_name', existing.first_name)
                     existing.last_name = row.get('last_name', existing.last_name)
                     existing.company = row.get('company', existing.company)
-                    
+
                     # Parse tags
                     tags_str = row.get('tags', '')
                     if tags_str:
                         new_tags = [tag.strip() for tag in tags_str.split(',')]
                         existing.tags = list(set(existing.tags + new_tags))
-                    
+
                     updated += 1
                 else:
                     errors.append(f"Row {row_num}: Contact already exists")
                 continue
-            
+
+            if email in seen_emails:
+                errors.append(f"Row {row_num}: Duplicate email in file")
+                continue
+
             # Check limit for new contacts
             if not validate_contact_limit(current_user, current_count + imported + 1):
                 errors.append(f"Row {row_num}: Contact limit reached")
                 break
-            
+
             # Create new contact
             tags_str = row.get('tags', '')
             tags = [tag.strip() for tag in tags_str.split(',')] if tags_str else []
-            
-            new_contact = Contact(
-                user_id=current_user.id,
-                email=email,
-                first_name=row.get('first_name', '').strip(),
-                last_name=row.get('last_name', '').strip(),
-                company=row.get('company', '').strip(),
-                tags=tags
-            )
-            
-            db.add(new_contact)
+
+            to_insert.append({
+                "user_id": current_user.id,
+                "email": email,
+                "first_name": row.get('first_name', '').strip(),
+                "last_name": row.get('last_name', '').strip(),
+                "company": row.get('company', '').strip(),
+                "tags": tags
+            })
+            seen_emails.add(email)
             imported += 1
-            
+
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
-    
-    db.commit()
-    
+
+    # One multi-row INSERT for the new contacts; ON CONFLICT keeps a
+    # concurrent insert of the same email from failing the whole batch.
+    # Updates flush with the commit
+    if to_insert:
+        await db.execute(
+            pg_insert(Contact).on_conflict_do_nothing(
+                index_elements=['user_id', 'email']
+            ),
+            to_insert
+        )
+
+    await db.commit()
+    if imported:
+        await invalidate_contact_count(current_user.id)
+
     return {
         "imported": imported,
         "updated": updated,
@@ -287,47 +398,52 @@ async def export_contacts(
     status: Optional[ContactStatus] = None,
     tags: Optional[List[str]] = Query(None),
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Contact).filter(Contact.user_id == current_user.id)
-    
+    stmt = select(Contact).where(Contact.user_id == current_user.id)
+
     if status:
-        query = query.filter(Contact.status == status)
-    
+        stmt = stmt.where(Contact.status == status)
+
     if tags:
-        for tag in tags:
-            query = query.filter(Contact.tags.contains([tag]))
-    
-    contacts = query.all()
-    
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
-        'email', 'first_name', 'last_name', 'company', 
-        'tags', 'status', 'subscribed_at', 'engagement_score'
-    ])
-    
-    # Data
-    for contact in contacts:
+        # One GIN-indexed @> "contains all" probe instead of a filter per tag
+        stmt = stmt.where(cast(Contact.tags, JSONB).op('@>')(cast(tags, JSONB)))
+
+    # Stream rows straight from a server-side cursor to the client instead of
+    # buffering the whole export in memory; first bytes go out immediately
+    async def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        # Header
         writer.writerow([
-            contact.email,
-            contact.first_name or '',
-            contact.last_name or '',
-            contact.company or '',
-            ','.join(contact.tags),
-            contact.status,
-            contact.subscribed_at.isoformat(),
-            contact.engagement_score
+            'email', 'first_name', 'last_name', 'company',
+            'tags', 'status', 'subscribed_at', 'engagement_score'
         ])
-    
-    output.seek(0)
-    
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+        # Data
+        result = await db.stream(stmt.execution_options(yield_per=1000))
+        async for contact in result.scalars():
+            writer.writerow([
+                contact.email,
+                contact.first_name or '',
+                contact.last_name or '',
+                contact.company or '',
+                ','.join(contact.tags),
+                contact.status,
+                contact.subscribed_at.isoformat(),
+                contact.engagement_score
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
     from fastapi.responses import StreamingResponse
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        generate(),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename=contacts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -339,93 +455,111 @@ async def bulk_update_contacts(
     contact_ids: List[int],
     update_data: ContactUpdate,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Get contacts
-    contacts = db.query(Contact).filter(
-        and_(
-            Contact.user_id == current_user.id,
-            Contact.id.in_(contact_ids)
+    update_dict = update_data.dict(exclude_unset=True)
+    values = {
+        field: value for field, value in update_dict.items() if field != "tags"
+    }
+
+    if update_dict.get("tags") is not None:
+        # Merge tags instead of replacing, in SQL: unnest the concatenated
+        # arrays and re-aggregate the distinct elements per row
+        element = func.jsonb_array_elements_text(
+            cast(Contact.tags, JSONB).concat(cast(update_dict["tags"], JSONB))
+        ).column_valued('t')
+        merged = select(func.jsonb_agg(distinct(element))).scalar_subquery()
+        values["tags"] = cast(func.coalesce(merged, cast([], JSONB)), JSON)
+
+    if not values:
+        return {"message": "Updated 0 contacts"}
+
+    # One UPDATE for the whole batch instead of loading each row into the
+    # session and flushing it back
+    result = await db.execute(
+        update(Contact)
+        .where(
+            and_(
+                Contact.user_id == current_user.id,
+                Contact.id.in_(contact_ids)
+            )
         )
-    ).all()
-    
-    if not contacts:
+        .values(**values)
+    )
+
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No contacts found"
         )
-    
-    # Update contacts
-    update_dict = update_data.dict(exclude_unset=True)
-    for contact in contacts:
-        for field, value in update_dict.items():
-            if field == "tags" and value is not None:
-                # Merge tags instead of replacing
-                contact.tags = list(set(contact.tags + value))
-            else:
-                setattr(contact, field, value)
-    
-    db.commit()
-    
-    return {"message": f"Updated {len(contacts)} contacts"}
+
+    await db.commit()
+
+    return {"message": f"Updated {result.rowcount} contacts"}
 
 @router.post("/bulk-delete")
 async def bulk_delete_contacts(
     contact_ids: List[int],
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Delete contacts
-    deleted = db.query(Contact).filter(
-        and_(
-            Contact.user_id == current_user.id,
-            Contact.id.in_(contact_ids)
+    from sqlalchemy import delete
+    result = await db.execute(
+        delete(Contact).where(
+            and_(
+                Contact.user_id == current_user.id,
+                Contact.id.in_(contact_ids)
+            )
         )
-    ).delete(synchronize_session=False)
-    
-    db.commit()
-    
-    return {"message": f"Deleted {deleted} contacts"}
+    )
+
+    await db.commit()
+    if result.rowcount:
+        await invalidate_contact_count(current_user.id)
+
+    return {"message": f"Deleted {result.rowcount} contacts"}
 
 @router.get("/tags/all")
 async def get_all_tags(
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Get all unique tags
-    contacts = db.query(Contact).filter(
-        Contact.user_id == current_user.id
-    ).all()
-    
-    all_tags = set()
-    for contact in contacts:
-        all_tags.update(contact.tags)
-    
-    return {"tags": sorted(list(all_tags))}
+    # Get all unique tags; DISTINCT over the unnested arrays happens in the
+    # database so only the tag strings cross the wire, not every contact row
+    all_tags = (await db.execute(
+        select(func.jsonb_array_elements_text(cast(Contact.tags, JSONB)))
+        .where(Contact.user_id == current_user.id)
+        .distinct()
+    )).scalars().all()
+
+    return {"tags": sorted(all_tags)}
 
 @router.post("/{contact_id}/unsubscribe")
 async def unsubscribe_contact(
     contact_id: int,
     current_user: User = Depends(get_current_verified_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    contact = db.query(Contact).filter(
-        and_(
-            Contact.id == contact_id,
-            Contact.user_id == current_user.id
+    contact = (await db.execute(
+        select(Contact).where(
+            and_(
+                Contact.id == contact_id,
+                Contact.user_id == current_user.id
+            )
         )
-    ).first()
-    
+    )).scalar_one_or_none()
+
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    
+
     contact.status = ContactStatus.UNSUBSCRIBED
     contact.unsubscribed_at = func.now()
-    db.commit()
-    
+    await db.commit()
+
     return {"message": "Contact unsubscribed"}
 
-from datetime import datetime
\ No newline at end of file
+from datetime import datetime
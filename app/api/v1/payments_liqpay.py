@@ -1,11 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, tuple_
 from app.core.database import get_db
 from app.core.security import get_current_verified_user
-from app.models.models import User, UserPlan, Payment
+from app.models.models import User, Payment
 from app.schemas.schemas import CheckoutSessionResponse, SubscriptionStatus
 from app.services.liqpay_service import LiqPayService
-from datetime import datetime, timedelta
+from app.services.payment_tasks import refresh_payment_status
+from app.core.redis import (
+    redis_client, contact_count_key, CONTACT_COUNT_TTL_SECONDS,
+    subscription_key, SUBSCRIPTION_TTL_SECONDS
+)
+from app.utils.pagination import encode_cursor, decode_cursor
+import json
+from datetime import datetime
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +22,9 @@ router = APIRouter()
 
 liqpay_service = LiqPayService()
 
+# Статуси, які LiqPay вже не змінить — перевіряти їх повторно немає сенсу
+TERMINAL_PAYMENT_STATUSES = {'success', 'failure', 'error', 'reversed'}
+
 # Ціни в гривнях
 PLAN_PRICES_UAH = {
     "starter": 1190,      # ~$29
@@ -77,7 +89,7 @@ async def create_checkout_session(
         )
         
     except Exception as e:
-        logger.error(f"Помилка створення платежу: {e}")
+        logger.error("Помилка створення платежу: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Не вдалося створити платіж"
@@ -90,27 +102,72 @@ async def get_subscription_status(
 ):
     """Отримати статус підписки"""
     from app.models.models import Contact
-    
-    # Рахуємо контакти
-    contact_count = db.query(Contact).filter(
-        Contact.user_id == current_user.id
-    ).count()
-    
+
+    # Рахуємо контакти; дашборд опитує цей ендпоінт, тому тримаємо
+    # лічильник у Redis з коротким TTL замість COUNT(*) на кожен запит
+    contact_count = None
+    try:
+        cached = await redis_client.get(contact_count_key(current_user.id))
+        if cached is not None:
+            contact_count = int(cached)
+    except Exception as e:
+        logger.warning("Redis недоступний для лічильника контактів: %s", e)
+
+    if contact_count is None:
+        contact_count = db.query(Contact).filter(
+            Contact.user_id == current_user.id
+        ).count()
+        try:
+            await redis_client.setex(
+                contact_count_key(current_user.id),
+                CONTACT_COUNT_TTL_SECONDS,
+                contact_count
+            )
+        except Exception:
+            pass
+
     # Отримуємо ліміт контактів для плану
     from app.core.config import settings
     contact_limit = settings.get_contact_limit(current_user.plan.value)
     
-    # Перевіряємо активну підписку
-    active_payment = db.query(Payment).filter(
-        Payment.user_id == current_user.id,
-        Payment.status == 'success',
-        Payment.expires_at > datetime.utcnow()
-    ).order_by(Payment.expires_at.desc()).first()
-    
+    # Перевіряємо активну підписку; знімок живе в Redis 5 хвилин і
+    # скидається при скасуванні, ручній перевірці статусу та з webhook
+    subscription = None
+    try:
+        cached = await redis_client.get(subscription_key(current_user.id))
+        if cached is not None:
+            subscription = json.loads(cached)
+    except Exception as e:
+        logger.warning("Redis недоступний для статусу підписки: %s", e)
+
+    if subscription is None:
+        # func.now() обчислюється в базі, тож планувальник може
+        # скористатися частковим індексом ix_payment_active
+        active_payment = db.query(Payment).filter(
+            Payment.user_id == current_user.id,
+            Payment.status == 'success',
+            Payment.expires_at > func.now()
+        ).order_by(Payment.expires_at.desc()).first()
+
+        subscription = {
+            "active": active_payment is not None,
+            "current_period_end": (
+                active_payment.expires_at.isoformat() if active_payment else None
+            )
+        }
+        try:
+            await redis_client.setex(
+                subscription_key(current_user.id),
+                SUBSCRIPTION_TTL_SECONDS,
+                json.dumps(subscription)
+            )
+        except Exception:
+            pass
+
     return SubscriptionStatus(
-        active=active_payment is not None,
+        active=subscription["active"],
         plan=current_user.plan,
-        current_period_end=active_payment.expires_at if active_payment else None,
+        current_period_end=subscription["current_period_end"],
         cancel_at_period_end=False,  # LiqPay не має автоматичного скасування
         contact_usage=contact_count,
         contact_limit=contact_limit
@@ -127,7 +184,7 @@ async def cancel_subscription(
         Payment.user_id == current_user.id,
         Payment.status == 'success',
         Payment.payment_type == 'subscription',
-        Payment.expires_at > datetime.utcnow()
+        Payment.expires_at > func.now()
     ).first()
     
     if not active_payment:
@@ -137,20 +194,29 @@ async def cancel_subscription(
         )
     
     try:
-        # Скасовуємо в LiqPay
-        result = liqpay_service.cancel_subscription(active_payment.order_id)
+        # Скасовуємо в LiqPay; HTTP-виклик іде в worker-потік, щоб не
+        # блокувати event loop
+        result = await asyncio.to_thread(
+            liqpay_service.cancel_subscription, active_payment.order_id
+        )
         
         # Оновлюємо статус
         active_payment.cancelled_at = datetime.utcnow()
         db.commit()
-        
+
+        # Скидаємо кешований знімок підписки
+        try:
+            await redis_client.delete(subscription_key(current_user.id))
+        except Exception:
+            pass
+
         return {
             "message": "Підписку буде скасовано в кінці поточного періоду",
             "expires_at": active_payment.expires_at
         }
         
     except Exception as e:
-        logger.error(f"Помилка скасування підписки: {e}")
+        logger.error("Помилка скасування підписки: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Не вдалося скасувати підписку"
@@ -158,31 +224,43 @@ async def cancel_subscription(
 
 @router.get("/payment-history")
 async def get_payment_history(
-    skip: int = 0,
     limit: int = 20,
+    cursor: str = None,
     current_user: User = Depends(get_current_verified_user),
     db: Session = Depends(get_db)
 ):
     """Отримати історію платежів"""
-    payments = db.query(Payment).filter(
-        Payment.user_id == current_user.id
-    ).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
-    
+    # Core select без ORM-гідратації: рядки йдуть у відповідь як мапи,
+    # без identity map та інструментованих об'єктів
+    stmt = select(
+        Payment.id, Payment.order_id, Payment.amount, Payment.currency,
+        Payment.status, Payment.plan, Payment.payment_type,
+        Payment.created_at, Payment.expires_at
+    ).where(Payment.user_id == current_user.id)
+
+    # Keyset-пагінація замість OFFSET: глибокі сторінки не змушують базу
+    # читати й відкидати перші N рядків
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Невірний курсор"
+            )
+        stmt = stmt.where(tuple_(Payment.created_at, Payment.id) < tuple_(*position))
+
+    payments = db.execute(
+        stmt.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit)
+    ).mappings().all()
+
+    next_cursor = None
+    if len(payments) == limit:
+        last = payments[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
     return {
-        "payments": [
-            {
-                "id": p.id,
-                "order_id": p.order_id,
-                "amount": p.amount,
-                "currency": p.currency,
-                "status": p.status,
-                "plan": p.plan,
-                "payment_type": p.payment_type,
-                "created_at": p.created_at,
-                "expires_at": p.expires_at
-            }
-            for p in payments
-        ]
+        "payments": [dict(p) for p in payments],
+        "next_cursor": next_cursor
     }
 
 @router.post("/check-payment-status/{order_id}")
@@ -202,36 +280,48 @@ async def check_payment_status(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Платіж не знайдено"
         )
-    
+
+    # Термінальний статус уже не зміниться — відповідаємо без LiqPay
+    if payment.status in TERMINAL_PAYMENT_STATUSES:
+        return {
+            "status": payment.status,
+            "liqpay_status": payment.status,
+            "updated": False
+        }
+
+    # Коалесуємо конкурентні опитування: не частіше раза на 5 секунд
+    # на order_id, інакше віддаємо поточний статус з бази
     try:
-        # Перевіряємо статус в LiqPay
-        status_data = liqpay_service.check_payment_status(order_id)
-        
-        # Оновлюємо статус якщо змінився
-        if status_data.get('status') != payment.status:
-            payment.status = status_data.get('status')
-            
-            if status_data.get('status') == 'success':
-                # Оновлюємо план користувача
-                current_user.plan = UserPlan(payment.plan)
-                
-                # Встановлюємо дату закінчення
-                if payment.payment_type == 'subscription':
-                    payment.expires_at = datetime.utcnow() + timedelta(days=30)
-                else:
-                    payment.expires_at = datetime.utcnow() + timedelta(days=30 * payment.months)
-            
-            db.commit()
-        
+        acquired = await redis_client.set(
+            f"lp:check:{order_id}", "1", nx=True, ex=5
+        )
+    except Exception:
+        acquired = True
+    if not acquired:
         return {
             "status": payment.status,
-            "liqpay_status": status_data.get('status'),
-            "updated": status_data.get('status') != payment.status
+            "liqpay_status": payment.status,
+            "updated": False
         }
-        
+
+    # Ставимо оновлення в чергу воркера: клієнт одразу отримує поточний
+    # статус, а LiqPay опитується та база оновлюється у фоні
+    try:
+        refresh_payment_status.delay(order_id)
     except Exception as e:
-        logger.error(f"Помилка перевірки статусу: {e}")
+        logger.error("Не вдалося поставити перевірку статусу в чергу: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Не вдалося перевірити статус"
-        )
\ No newline at end of file
+        )
+
+    # Скидаємо кешований знімок підписки — воркер може змінити статус
+    try:
+        await redis_client.delete(subscription_key(current_user.id))
+    except Exception:
+        pass
+
+    return {
+        "status": payment.status,
+        "queued": True
+    }
\ No newline at end of file
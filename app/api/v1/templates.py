@@ -1,19 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, insert
 from typing import List, Optional
 from app.core.database import get_db
 from app.core.security import get_current_verified_user
 from app.models.models import User, Template
 from app.schemas.schemas import (
     TemplateCreate, TemplateUpdate, Template as TemplateSchema,
-    PaginatedResponse
+    TemplateSummary, PaginatedResponse
 )
+from app.core.redis import redis_client
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Categories change rarely; a short TTL covers default-template seeding,
+# which cannot target every user's key
+TEMPLATE_CATEGORIES_TTL_SECONDS = 300
+
+def template_categories_key(user_id: int) -> str:
+    return f"tpl_cats:{user_id}"
+
+async def invalidate_template_categories(user_id: int):
+    """Drop the cached category list after a template changes"""
+    try:
+        await redis_client.delete(template_categories_key(user_id))
+    except Exception as e:
+        logger.warning("Template categories invalidation failed: %s", e)
+
 @router.post("/", response_model=TemplateSchema)
 async def create_template(
     template_data: TemplateCreate,
@@ -29,7 +45,8 @@ async def create_template(
     db.add(db_template)
     db.commit()
     db.refresh(db_template)
-    
+    await invalidate_template_categories(current_user.id)
+
     return db_template
 
 @router.get("/", response_model=PaginatedResponse)
@@ -59,17 +76,35 @@ async def get_templates(
         query = query.filter(Template.category == category)
     
     if search:
+        # Single predicate over the expression ix_template_search_trgm
+        # covers, so the search runs off the trigram index
         query = query.filter(
-            or_(
-                Template.name.ilike(f"%{search}%"),
-                Template.subject.ilike(f"%{search}%"),
-                Template.content.ilike(f"%{search}%")
-            )
+            Template.name
+            .concat(' ').concat(func.coalesce(Template.subject, ''))
+            .concat(' ').concat(Template.content)
+            .ilike(f"%{search}%")
         )
     
-    total = query.count()
-    templates = query.order_by(Template.created_at.desc()).offset(skip).limit(limit).all()
-    
+    # Window-function count rides along with the page so the filters run
+    # once; only the summary columns ship, never the content blobs
+    rows = (
+        query.with_entities(
+            Template.id, Template.name, Template.subject, Template.category,
+            Template.is_default, Template.usage_count, Template.created_at,
+            func.count().over().label('total')
+        )
+        .order_by(Template.created_at.desc())
+        .offset(skip).limit(limit).all()
+    )
+
+    if rows:
+        total = rows[0].total
+        templates = [TemplateSummary.model_validate(row) for row in rows]
+    else:
+        # Page beyond the result set: fall back to a plain count
+        total = query.count()
+        templates = []
+
     return PaginatedResponse(
         total=total,
         items=templates,
@@ -82,6 +117,15 @@ async def get_template_categories(
     current_user: User = Depends(get_current_verified_user),
     db: Session = Depends(get_db)
 ):
+    # Serve the DISTINCT scan from cache when possible
+    cache_key = template_categories_key(current_user.id)
+    try:
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return {"categories": json.loads(cached)}
+    except Exception as e:
+        logger.warning("Redis unavailable for template categories: %s", e)
+
     # Get unique categories
     categories = db.query(Template.category).filter(
         or_(
@@ -90,10 +134,16 @@ async def get_template_categories(
         ),
         Template.category.isnot(None)
     ).distinct().all()
-    
-    return {
-        "categories": [cat[0] for cat in categories if cat[0]]
-    }
+
+    result = [cat[0] for cat in categories if cat[0]]
+    try:
+        await redis_client.setex(
+            cache_key, TEMPLATE_CATEGORIES_TTL_SECONDS, json.dumps(result)
+        )
+    except Exception:
+        pass
+
+    return {"categories": result}
 
 @router.get("/{template_id}", response_model=TemplateSchema)
 async def get_template(
@@ -144,7 +194,8 @@ async def update_template(
     
     db.commit()
     db.refresh(template)
-    
+    await invalidate_template_categories(current_user.id)
+
     return template
 
 @router.delete("/{template_id}")
@@ -168,7 +219,8 @@ async def delete_template(
     
     db.delete(template)
     db.commit()
-    
+    await invalidate_template_categories(current_user.id)
+
     return {"message": "Template deleted successfully"}
 
 @router.post("/{template_id}/duplicate", response_model=TemplateSchema)
@@ -209,110 +261,116 @@ async def duplicate_template(
     
     return new_template
 
+# Built once at import; the seeder reads these, they never change at runtime
+DEFAULT_TEMPLATES = [
+    {
+        "name": "Welcome Email",
+        "subject": "Welcome to {{company_name}}!",
+        "content": """
+            <h2>Welcome {{first_name}}!</h2>
+            <p>We're thrilled to have you join our community.</p>
+            <p>Here's what you can expect:</p>
+            <ul>
+                <li>Weekly tips and insights</li>
+                <li>Exclusive offers for subscribers</li>
+                <li>Early access to new features</li>
+            </ul>
+            <p>Get started by exploring your dashboard.</p>
+            <p>Best regards,<br>The {{company_name}} Team</p>
+        """,
+        "category": "Welcome",
+        "is_default": True
+    },
+    {
+        "name": "Newsletter",
+        "subject": "{{company_name}} Newsletter - {{month}} Edition",
+        "content": """
+            <h2>{{month}} Newsletter</h2>
+            <p>Hi {{first_name}},</p>
+            <p>Here are this month's highlights:</p>
+            <h3>Featured Article</h3>
+            <p>[Add your featured content here]</p>
+            <h3>Product Updates</h3>
+            <p>[List recent updates or improvements]</p>
+            <h3>Community Spotlight</h3>
+            <p>[Highlight a customer success story]</p>
+            <p>Thanks for being part of our community!</p>
+            <p>Best,<br>{{sender_name}}</p>
+        """,
+        "category": "Newsletter",
+        "is_default": True
+    },
+    {
+        "name": "Product Announcement",
+        "subject": "Introducing: {{product_name}}",
+        "content": """
+            <h2>Exciting News!</h2>
+            <p>Hi {{first_name}},</p>
+            <p>We're excited to announce the launch of {{product_name}}!</p>
+            <p>[Describe the product and its benefits]</p>
+            <h3>Key Features:</h3>
+            <ul>
+                <li>[Feature 1]</li>
+                <li>[Feature 2]</li>
+                <li>[Feature 3]</li>
+            </ul>
+            <p>As a valued customer, you get early access!</p>
+            <p><a href="{{cta_link}}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Get Started</a></p>
+            <p>Questions? Just reply to this email.</p>
+            <p>Best,<br>{{sender_name}}</p>
+        """,
+        "category": "Announcement",
+        "is_default": True
+    },
+    {
+        "name": "Re-engagement",
+        "subject": "We miss you, {{first_name}}!",
+        "content": """
+            <h2>It's been a while!</h2>
+            <p>Hi {{first_name}},</p>
+            <p>We noticed you haven't visited us in a while, and we wanted to check in.</p>
+            <p>Here's what you've missed:</p>
+            <ul>
+                <li>[Update 1]</li>
+                <li>[Update 2]</li>
+                <li>[Update 3]</li>
+            </ul>
+            <p>As a welcome back gift, here's a special offer just for you:</p>
+            <p><strong>{{offer_description}}</strong></p>
+            <p><a href="{{cta_link}}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Claim Your Offer</a></p>
+            <p>We'd love to have you back!</p>
+            <p>Best,<br>The {{company_name}} Team</p>
+        """,
+        "category": "Re-engagement",
+        "is_default": True
+    }
+]
+
 @router.post("/default-templates/seed")
 async def seed_default_templates(
     db: Session = Depends(get_db)
 ):
     """Seed default templates (admin only)"""
     # This would be protected by admin authentication in production
-    
-    default_templates = [
-        {
-            "name": "Welcome Email",
-            "subject": "Welcome to {{company_name}}!",
-            "content": """
-                <h2>Welcome {{first_name}}!</h2>
-                <p>We're thrilled to have you join our community.</p>
-                <p>Here's what you can expect:</p>
-                <ul>
-                    <li>Weekly tips and insights</li>
-                    <li>Exclusive offers for subscribers</li>
-                    <li>Early access to new features</li>
-                </ul>
-                <p>Get started by exploring your dashboard.</p>
-                <p>Best regards,<br>The {{company_name}} Team</p>
-            """,
-            "category": "Welcome",
-            "is_default": True
-        },
-        {
-            "name": "Newsletter",
-            "subject": "{{company_name}} Newsletter - {{month}} Edition",
-            "content": """
-                <h2>{{month}} Newsletter</h2>
-                <p>Hi {{first_name}},</p>
-                <p>Here are this month's highlights:</p>
-                <h3>Featured Article</h3>
-                <p>[Add your featured content here]</p>
-                <h3>Product Updates</h3>
-                <p>[List recent updates or improvements]</p>
-                <h3>Community Spotlight</h3>
-                <p>[Highlight a customer success story]</p>
-                <p>Thanks for being part of our community!</p>
-                <p>Best,<br>{{sender_name}}</p>
-            """,
-            "category": "Newsletter",
-            "is_default": True
-        },
-        {
-            "name": "Product Announcement",
-            "subject": "Introducing: {{product_name}}",
-            "content": """
-                <h2>Exciting News!</h2>
-                <p>Hi {{first_name}},</p>
-                <p>We're excited to announce the launch of {{product_name}}!</p>
-                <p>[Describe the product and its benefits]</p>
-                <h3>Key Features:</h3>
-                <ul>
-                    <li>[Feature 1]</li>
-                    <li>[Feature 2]</li>
-                    <li>[Feature 3]</li>
-                </ul>
-                <p>As a valued customer, you get early access!</p>
-                <p><a href="{{cta_link}}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Get Started</a></p>
-                <p>Questions? Just reply to this email.</p>
-                <p>Best,<br>{{sender_name}}</p>
-            """,
-            "category": "Announcement",
-            "is_default": True
-        },
-        {
-            "name": "Re-engagement",
-            "subject": "We miss you, {{first_name}}!",
-            "content": """
-                <h2>It's been a while!</h2>
-                <p>Hi {{first_name}},</p>
-                <p>We noticed you haven't visited us in a while, and we wanted to check in.</p>
-                <p>Here's what you've missed:</p>
-                <ul>
-                    <li>[Update 1]</li>
-                    <li>[Update 2]</li>
-                    <li>[Update 3]</li>
-                </ul>
-                <p>As a welcome back gift, here's a special offer just for you:</p>
-                <p><strong>{{offer_description}}</strong></p>
-                <p><a href="{{cta_link}}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Claim Your Offer</a></p>
-                <p>We'd love to have you back!</p>
-                <p>Best,<br>The {{company_name}} Team</p>
-            """,
-            "category": "Re-engagement",
-            "is_default": True
-        }
-    ]
-    
-    for template_data in default_templates:
-        # Check if already exists
-        existing = db.query(Template).filter(
+
+    # One IN query instead of a SELECT per template name
+    existing = {
+        name for (name,) in db.query(Template.name).filter(
             and_(
-                Template.name == template_data["name"],
-                Template.is_default == True
+                Template.is_default == True,
+                Template.name.in_([t["name"] for t in DEFAULT_TEMPLATES])
             )
-        ).first()
-        
-        if not existing:
-            template = Template(**template_data)
-            db.add(template)
-    
+        ).all()
+    }
+
+    new_templates = [
+        t for t in DEFAULT_TEMPLATES if t["name"] not in existing
+    ]
+    if new_templates:
+        # Core executemany: one INSERT with VALUES tuples, no unit-of-work
+        # bookkeeping per row
+        db.execute(insert(Template), new_templates)
+
     db.commit()
-    
-    return {"message": f"Seeded {len(default_templates)} default templates"}
\ No newline at end of file
+
+    return {"message": f"Seeded {len(DEFAULT_TEMPLATES)} default templates"}
\ No newline at end of file
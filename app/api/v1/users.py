@@ -1,86 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import get_current_user, get_password_hash
-from app.models.models import User
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response, status
+import asyncio
+import hashlib
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from app.api.deps import DB, CurrentUser
+from app.core.security import get_password_hash, verify_password
+from app.core.redis import redis_client, user_cache_key
+from app.models.models import User, Payment
 from app.schemas.schemas import UserUpdate, User as UserSchema
+from app.services.liqpay_service import LiqPayService
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+liqpay_service = LiqPayService()
+
+async def invalidate_user_cache(user_id: int):
+    """Drop the cached auth snapshot after any profile write."""
+    try:
+        await redis_client.delete(user_cache_key(user_id))
+    except Exception as e:
+        logger.warning("Failed to invalidate user cache: %s", e)
+
 @router.get("/me", response_model=UserSchema)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser
 ):
+    # ETag derived from the last profile write; polling clients get a 304
+    # with no body and skip serialization entirely
+    stamp = current_user.updated_at or current_user.created_at
+    etag = hashlib.md5(
+        f"{current_user.id}:{stamp.timestamp() if stamp else 0}".encode()
+    ).hexdigest()
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    response.headers["ETag"] = etag
     return current_user
 
 @router.put("/me", response_model=UserSchema)
 async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser,
+    db: DB
 ):
     # Update user fields
     update_data = user_update.dict(exclude_unset=True)
-    
-    # Check if email is being changed
-    if "email" in update_data and update_data["email"] != current_user.email:
-        # Check if new email already exists
-        existing_user = db.query(User).filter(
-            User.email == update_data["email"]
-        ).first()
-        
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
-    
-    db.commit()
-    db.refresh(current_user)
-    
-    return current_user
+
+    if not update_data:
+        return current_user
+
+    # Single UPDATE ... RETURNING: writes by id (current_user may be a
+    # detached cached snapshot) and hands back the fresh row without a
+    # refresh round-trip. Email uniqueness is enforced by the unique
+    # index: catching the IntegrityError saves a pre-check SELECT and
+    # closes the TOCTOU race
+    try:
+        updated_user = db.execute(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(**update_data)
+            .returning(User),
+            execution_options={"synchronize_session": False}
+        ).scalar_one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    await invalidate_user_cache(current_user.id)
+
+    return updated_user
 
 @router.post("/change-password")
 async def change_password(
     current_password: str,
     new_password: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser,
+    db: DB
 ):
-    # Verify current password
-    from app.core.security import verify_password
-    
-    if not verify_password(current_password, current_user.hashed_password):
+    # Verify current password; hashing is CPU-bound, keep it off the loop
+    if not await asyncio.to_thread(
+        verify_password, current_password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
-    
-    # Update password
-    current_user.hashed_password = get_password_hash(new_password)
+
+    # Update password; current_user may be detached, so write by id
+    new_hash = await asyncio.to_thread(get_password_hash, new_password)
+    db.query(User).filter(User.id == current_user.id).update(
+        {"hashed_password": new_hash}
+    )
     db.commit()
-    
+    await invalidate_user_cache(current_user.id)
+
     return {"message": "Password changed successfully"}
 
 @router.delete("/me")
 async def delete_account(
-    confirm: bool = False,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser,
+    db: DB,
+    confirm: bool = False
 ):
     if not confirm:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Please confirm account deletion"
         )
-    
-    # Delete user and all related data (cascade delete)
-    db.delete(current_user)
+
+    # Grab active subscription order ids before the cascade removes them;
+    # the LiqPay unsubscribe round-trips happen after the response
+    active_order_ids = [
+        order_id for (order_id,) in db.query(Payment.order_id).filter(
+            Payment.user_id == current_user.id,
+            Payment.payment_type == 'subscription',
+            Payment.status == 'success',
+            Payment.expires_at > func.now()
+        ).all()
+    ]
+
+    # Delete by id; the database cascades to all related rows
+    db.query(User).filter(User.id == current_user.id).delete()
     db.commit()
-    
+    await invalidate_user_cache(current_user.id)
+
+    for order_id in active_order_ids:
+        background_tasks.add_task(liqpay_service.cancel_subscription, order_id)
+
     return {"message": "Account deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,15 @@
+from celery import Celery
+from app.core.config import settings
+
+celery_app = Celery(
+    "email_app",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL,
+    include=["app.services.email_tasks", "app.services.payment_tasks"],
+)
+
+celery_app.conf.update(
+    task_default_queue="emails",
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
@@ -0,0 +1,23 @@
+import redis.asyncio as redis
+from app.core.config import settings
+
+redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Per-user contact count, polled by the subscription widget; short TTL and
+# invalidated from the contact CRUD paths
+CONTACT_COUNT_TTL_SECONDS = 60
+
+def contact_count_key(user_id: int) -> str:
+    return f"contact_count:{user_id}"
+
+# Active-subscription snapshot served by /payments/subscription; invalidated
+# by the cancel endpoint, manual status checks and the LiqPay webhook
+SUBSCRIPTION_TTL_SECONDS = 300
+
+def subscription_key(user_id: int) -> str:
+    return f"subscription:{user_id}"
+
+# Authenticated-user snapshot read by get_current_user; keyed by user id so
+# profile writes can invalidate it, TTL bounded by the access-token lifetime
+def user_cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
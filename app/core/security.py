@@ -7,18 +7,52 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.database import get_db
-from app.models.models import User
+from app.core.redis import redis_client, user_cache_key
+from app.models.models import User, UserPlan
 import secrets
+import json
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2id is the primary scheme; bcrypt stays verifiable so existing
+# hashes keep working and get upgraded transparently on successful login
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Cached user snapshots live at most as long as an access token
+USER_CACHE_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def _user_to_cache(user: User) -> str:
+    return json.dumps({
+        "id": user.id,
+        "email": user.email,
+        "hashed_password": user.hashed_password,
+        "full_name": user.full_name,
+        "company_name": user.company_name,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+        "plan": user.plan.value,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+    })
+
+def _user_from_cache(raw: str) -> User:
+    data = json.loads(raw)
+    data["plan"] = UserPlan(data["plan"])
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = datetime.fromisoformat(data[field])
+    # Detached instance: good for reads; write endpoints update by id
+    return User(**data)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify and, for deprecated schemes, return an upgraded hash."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -63,10 +97,29 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Redis snapshot first: skips the per-request DB round-trip that
+    # dominates small endpoints like GET /me. Falls back to the DB on a
+    # miss or when Redis is unavailable
+    user = None
+    try:
+        cached = await redis_client.get(user_cache_key(user_id))
+        if cached is not None:
+            user = _user_from_cache(cached)
+    except Exception:
+        pass
+
     if user is None:
-        raise credentials_exception
-    
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise credentials_exception
+        try:
+            await redis_client.setex(
+                user_cache_key(user_id), USER_CACHE_TTL_SECONDS,
+                _user_to_cache(user)
+            )
+        except Exception:
+            pass
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON, Enum as SQLEnum, UniqueConstraint, Index, cast, event, DDL, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
 
+# Trigram indexes below need pg_trgm; create_all runs this before the tables
+event.listen(
+    Base.metadata, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+)
+
 class UserPlan(str, enum.Enum):
     FREE = "free"
     STARTER = "starter"
@@ -39,18 +46,26 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Relationships
-    campaigns = relationship("Campaign", back_populates="user", cascade="all, delete-orphan")
-    contacts = relationship("Contact", back_populates="user", cascade="all, delete-orphan")
-    templates = relationship("Template", back_populates="user", cascade="all, delete-orphan")
-    api_keys = relationship("APIKey", back_populates="user", cascade="all, delete-orphan")
-    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
+    # Relationships. lazy="raise_on_sql" turns accidental lazy loads (N+1)
+    # into loud errors; queries that really need a collection must say so
+    # with selectinload. passive_deletes defers cascades to the DB-level
+    # ON DELETE CASCADE instead of loading every child row into the session
+    campaigns = relationship("Campaign", back_populates="user", cascade="all, delete-orphan",
+                             lazy="raise_on_sql", passive_deletes=True)
+    contacts = relationship("Contact", back_populates="user", cascade="all, delete-orphan",
+                            lazy="raise_on_sql", passive_deletes=True)
+    templates = relationship("Template", back_populates="user", cascade="all, delete-orphan",
+                             lazy="raise_on_sql", passive_deletes=True)
+    api_keys = relationship("APIKey", back_populates="user", cascade="all, delete-orphan",
+                            lazy="raise_on_sql", passive_deletes=True)
+    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan",
+                            lazy="raise_on_sql", passive_deletes=True)
 
 class Campaign(Base):
     __tablename__ = "campaigns"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String, nullable=False)
     subject = Column(String, nullable=False)
     content = Column(Text, nullable=False)
@@ -65,21 +80,30 @@ class Campaign(Base):
     unsubscribes_count = Column(Integer, default=0)
     bounces_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
     # AI-generated fields
     ai_suggestions = Column(JSON)
     optimization_score = Column(Float)
     
     # Relationships
     user = relationship("User", back_populates="campaigns")
-    emails = relationship("Email", back_populates="campaign", cascade="all, delete-orphan")
+    emails = relationship("Email", back_populates="campaign", cascade="all, delete-orphan",
+                          lazy="raise_on_sql", passive_deletes=True)
+
+    # Indexes for analytics queries, keyset pagination and ILIKE search
+    __table_args__ = (
+        Index('ix_campaign_user_created', 'user_id', 'created_at', 'id'),
+        Index('ix_campaign_search_trgm',
+              text("(lower(name) || ' ' || lower(subject)) gin_trgm_ops"),
+              postgresql_using='gin'),
+    )
 
 class Contact(Base):
     __tablename__ = "contacts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     email = Column(String, nullable=False)
     first_name = Column(String)
     last_name = Column(String)
@@ -92,22 +116,32 @@ class Contact(Base):
     last_activity = Column(DateTime(timezone=True))
     engagement_score = Column(Float, default=0.0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
     # Relationships
     user = relationship("User", back_populates="contacts")
-    emails = relationship("Email", back_populates="contact")
+    emails = relationship("Email", back_populates="contact",
+                          lazy="raise_on_sql", passive_deletes=True)
     
-    # Unique constraint
+    # Unique constraint + indexes for growth analytics and keyset pagination
     __table_args__ = (
         UniqueConstraint('user_id', 'email', name='_user_email_uc'),
+        Index('ix_contact_user_subscribed', 'user_id', 'subscribed_at'),
+        Index('ix_contact_user_created', 'user_id', 'created_at', 'id'),
+        # GIN index over tags (cast to jsonb) backing the @> tag filters
+        Index('ix_contact_tags_gin', cast(tags, JSONB), postgresql_using='gin'),
+        Index('ix_contact_search_trgm',
+              text("(lower(email) || ' ' || coalesce(lower(first_name), '')"
+                   " || ' ' || coalesce(lower(last_name), '')"
+                   " || ' ' || coalesce(lower(company), '')) gin_trgm_ops"),
+              postgresql_using='gin'),
     )
 
 class Template(Base):
     __tablename__ = "templates"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String, nullable=False)
     subject = Column(String)
     content = Column(Text, nullable=False)
@@ -120,12 +154,20 @@ class Template(Base):
     # Relationships
     user = relationship("User", back_populates="templates")
 
+    # Trigram index over the searchable text backing the ILIKE search
+    __table_args__ = (
+        Index('ix_template_search_trgm',
+              text("(name || ' ' || coalesce(subject, '')"
+                   " || ' ' || content) gin_trgm_ops"),
+              postgresql_using='gin'),
+    )
+
 class Email(Base):
     __tablename__ = "emails"
     
     id = Column(Integer, primary_key=True, index=True)
-    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
-    contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False)
     message_id = Column(String, unique=True)
     status = Column(String, default="pending")
     sent_at = Column(DateTime(timezone=True))
@@ -141,13 +183,28 @@ class Email(Base):
     # Relationships
     campaign = relationship("Campaign", back_populates="emails")
     contact = relationship("Contact", back_populates="emails")
-    events = relationship("EmailEvent", back_populates="email", cascade="all, delete-orphan")
+    events = relationship("EmailEvent", back_populates="email", cascade="all, delete-orphan",
+                          lazy="raise_on_sql", passive_deletes=True)
+
+    # Indexes for analytics queries; partial indexes stay small and let the
+    # planner index-only-scan the FILTER (WHERE ...) aggregates
+    __table_args__ = (
+        Index('ix_email_campaign_sent', 'campaign_id', 'sent_at'),
+        Index('ix_email_opened_partial', 'campaign_id',
+              postgresql_where=opened_at.isnot(None)),
+        Index('ix_email_clicked_partial', 'campaign_id',
+              postgresql_where=clicked_at.isnot(None)),
+        Index('ix_email_unsubscribed_partial', 'campaign_id',
+              postgresql_where=unsubscribed_at.isnot(None)),
+        Index('ix_email_bounced_partial', 'campaign_id',
+              postgresql_where=bounced_at.isnot(None)),
+    )
 
 class EmailEvent(Base):
     __tablename__ = "email_events"
     
     id = Column(Integer, primary_key=True, index=True)
-    email_id = Column(Integer, ForeignKey("emails.id"), nullable=False)
+    email_id = Column(Integer, ForeignKey("emails.id", ondelete="CASCADE"), nullable=False)
     event_type = Column(String, nullable=False)  # open, click, unsubscribe, bounce, complaint
     event_metadata = Column(JSON)  # Перейменовано з metadata
     ip_address = Column(String)
@@ -157,11 +214,16 @@ class EmailEvent(Base):
     # Relationships
     email = relationship("Email", back_populates="events")
 
+    # Index for engagement queries
+    __table_args__ = (
+        Index('ix_event_email_type_created', 'email_id', 'event_type', 'created_at'),
+    )
+
 class APIKey(Base):
     __tablename__ = "api_keys"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String, nullable=False)
     key = Column(String, unique=True, nullable=False, index=True)
     last_used_at = Column(DateTime(timezone=True))
@@ -177,7 +239,7 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     order_id = Column(String, unique=True, nullable=False, index=True)
     liqpay_payment_id = Column(String)
     subscription_id = Column(String)
@@ -192,6 +254,16 @@ class Payment(Base):
     cancelled_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+
     # Relationships
-    user = relationship("User", back_populates="payments")
\ No newline at end of file
+    user = relationship("User", back_populates="payments")
+
+    # Partial index so the active-subscription lookup
+    # (user_id, status='success', expires_at > now ORDER BY expires_at DESC)
+    # reads the index tip instead of scanning and sorting
+    __table_args__ = (
+        Index('ix_payment_active', user_id, expires_at.desc(),
+              postgresql_where=(status == 'success')),
+        # Keyset pagination for payment history
+        Index('ix_payment_user_created', user_id, created_at, id),
+    )
\ No newline at end of file
@@ -1,14 +1,36 @@
-from pydantic import BaseModel, EmailStr, constr, validator
-from typing import Optional, List, Dict, Any
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, constr
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime
+import re
 from app.models.models import UserPlan, CampaignStatus, ContactStatus
 
+# Shared config: defer_build skips validator construction at import time
+# (Pydantic builds lazily on first use), which keeps app startup from
+# paying for ~25 models most requests never touch; from_attributes is a
+# no-op for plain request models and lets response models read ORM rows
+_BASE_CONFIG = ConfigDict(defer_build=True, from_attributes=True)
+
+# Lightweight email check for bulk contact payloads: one precompiled
+# regex match instead of the full email-validator RFC machinery, which
+# dominates parse time when ContactImport carries thousands of rows.
+# Account signup keeps EmailStr, where correctness beats throughput
+_EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}$")
+
+def _fast_email_check(value: str) -> str:
+    if not _EMAIL_RE.match(value):
+        raise ValueError("invalid email address")
+    return value
+
+FastEmail = Annotated[str, AfterValidator(_fast_email_check)]
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
     full_name: Optional[str] = None
     company_name: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class UserCreate(UserBase):
     password: constr(min_length=8)
 
@@ -17,6 +39,8 @@ class UserUpdate(BaseModel):
     company_name: Optional[str] = None
     email: Optional[EmailStr] = None
 
+    model_config = _BASE_CONFIG
+
 class UserInDB(UserBase):
     id: int
     is_active: bool
@@ -25,8 +49,7 @@ class UserInDB(UserBase):
     created_at: datetime
     updated_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = _BASE_CONFIG
 
 class User(UserInDB):
     pass
@@ -37,13 +60,19 @@ class Token(BaseModel):
     refresh_token: str
     token_type: str = "bearer"
 
+    model_config = _BASE_CONFIG
+
 class TokenData(BaseModel):
     user_id: Optional[int] = None
 
+    model_config = _BASE_CONFIG
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+    model_config = _BASE_CONFIG
+
 # Campaign schemas
 class CampaignBase(BaseModel):
     name: str
@@ -52,6 +81,8 @@ class CampaignBase(BaseModel):
     from_name: Optional[str] = None
     from_email: Optional[EmailStr] = None
 
+    model_config = _BASE_CONFIG
+
 class CampaignCreate(CampaignBase):
     scheduled_at: Optional[datetime] = None
     contact_ids: Optional[List[int]] = []
@@ -66,6 +97,8 @@ class CampaignUpdate(BaseModel):
     scheduled_at: Optional[datetime] = None
     status: Optional[CampaignStatus] = None
 
+    model_config = _BASE_CONFIG
+
 class Campaign(CampaignBase):
     id: int
     user_id: int
@@ -82,23 +115,24 @@ class Campaign(CampaignBase):
     ai_suggestions: Optional[Dict[str, Any]]
     optimization_score: Optional[float]
     
-    class Config:
-        from_attributes = True
+    model_config = _BASE_CONFIG
 
 # Contact schemas
 class ContactBase(BaseModel):
-    email: EmailStr
+    email: FastEmail
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     company: Optional[str] = None
     tags: Optional[List[str]] = []
     custom_fields: Optional[Dict[str, Any]] = {}
 
+    model_config = _BASE_CONFIG
+
 class ContactCreate(ContactBase):
     pass
 
 class ContactUpdate(BaseModel):
-    email: Optional[EmailStr] = None
+    email: Optional[FastEmail] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     company: Optional[str] = None
@@ -106,6 +140,8 @@ class ContactUpdate(BaseModel):
     custom_fields: Optional[Dict[str, Any]] = None
     status: Optional[ContactStatus] = None
 
+    model_config = _BASE_CONFIG
+
 class Contact(ContactBase):
     id: int
     user_id: int
@@ -117,13 +153,14 @@ class Contact(ContactBase):
     created_at: datetime
     updated_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = _BASE_CONFIG
 
 class ContactImport(BaseModel):
     contacts: List[ContactBase]
     update_existing: bool = False
 
+    model_config = _BASE_CONFIG
+
 # Template schemas
 class TemplateBase(BaseModel):
     name: str
@@ -131,6 +168,8 @@ class TemplateBase(BaseModel):
     content: str
     category: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class TemplateCreate(TemplateBase):
     pass
 
@@ -140,6 +179,8 @@ class TemplateUpdate(BaseModel):
     content: Optional[str] = None
     category: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class Template(TemplateBase):
     id: int
     user_id: int
@@ -147,9 +188,20 @@ class Template(TemplateBase):
     usage_count: int
     created_at: datetime
     updated_at: Optional[datetime]
-    
-    class Config:
-        from_attributes = True
+
+    model_config = _BASE_CONFIG
+
+class TemplateSummary(BaseModel):
+    # List-view projection; leaves out the large content blob
+    id: int
+    name: str
+    subject: Optional[str] = None
+    category: Optional[str] = None
+    is_default: bool
+    usage_count: int
+    created_at: datetime
+
+    model_config = _BASE_CONFIG
 
 # Analytics schemas
 class AnalyticsOverview(BaseModel):
@@ -161,6 +213,23 @@ class AnalyticsOverview(BaseModel):
     total_unsubscribes: int
     total_bounces: int
 
+    model_config = _BASE_CONFIG
+
+# Typed sub-models instead of List[Dict[str, Any]]: pydantic-core gets
+# monomorphic int/str validators rather than the generic any-schema path
+class EngagementPoint(BaseModel):
+    hour: int
+    opens: int
+    clicks: int
+
+    model_config = _BASE_CONFIG
+
+class TopLink(BaseModel):
+    url: Optional[str]
+    clicks: int
+
+    model_config = _BASE_CONFIG
+
 class CampaignAnalytics(BaseModel):
     campaign_id: int
     sent_count: int
@@ -168,11 +237,13 @@ class CampaignAnalytics(BaseModel):
     click_rate: float
     unsubscribe_rate: float
     bounce_rate: float
-    engagement_over_time: List[Dict[str, Any]]
-    top_links: List[Dict[str, Any]]
+    engagement_over_time: List[EngagementPoint]
+    top_links: List[TopLink]
     device_stats: Dict[str, int]
     location_stats: Dict[str, int]
 
+    model_config = _BASE_CONFIG
+
 # AI schemas
 class SubjectLineRequest(BaseModel):
     content: str
@@ -180,10 +251,14 @@ class SubjectLineRequest(BaseModel):
     industry: Optional[str] = None
     target_audience: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class SubjectLineResponse(BaseModel):
     suggestions: List[str]
     analysis: Dict[str, Any]
 
+    model_config = _BASE_CONFIG
+
 class EmailContentRequest(BaseModel):
     purpose: str
     tone: Optional[str] = "professional"
@@ -192,32 +267,44 @@ class EmailContentRequest(BaseModel):
     call_to_action: Optional[str] = None
     personalization_fields: Optional[List[str]] = []
 
+    model_config = _BASE_CONFIG
+
 class EmailContentResponse(BaseModel):
     content: str
     subject_suggestions: List[str]
     optimization_tips: List[str]
 
+    model_config = _BASE_CONFIG
+
 class EmailOptimizationRequest(BaseModel):
     subject: str
     content: str
     target_audience: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class EmailOptimizationResponse(BaseModel):
     score: float
     improvements: List[Dict[str, str]]
     optimized_subject: Optional[str]
     optimized_content: Optional[str]
 
+    model_config = _BASE_CONFIG
+
 # Payment schemas
 class CreateCheckoutSession(BaseModel):
     plan: str
     success_url: Optional[str] = None
     cancel_url: Optional[str] = None
 
+    model_config = _BASE_CONFIG
+
 class CheckoutSessionResponse(BaseModel):
     checkout_url: str
     session_id: str
 
+    model_config = _BASE_CONFIG
+
 class SubscriptionStatus(BaseModel):
     active: bool
     plan: UserPlan
@@ -226,19 +313,36 @@ class SubscriptionStatus(BaseModel):
     contact_usage: int
     contact_limit: int
 
+    model_config = _BASE_CONFIG
+
 # Webhook schemas
 class WebhookEvent(BaseModel):
     type: str
     data: Dict[str, Any]
     created: datetime
 
+    model_config = _BASE_CONFIG
+
+# Batch schemas
+class BatchSubRequest(BaseModel):
+    method: str = "GET"
+    path: str
+    body: Optional[Dict[str, Any]] = None
+
+    model_config = _BASE_CONFIG
+
 # Pagination schemas
 class PaginationParams(BaseModel):
     skip: int = 0
     limit: int = 20
+
+    model_config = _BASE_CONFIG
     
 class PaginatedResponse(BaseModel):
     total: int
     items: List[Any]
-    skip: int
-    limit: int
\ No newline at end of file
+    limit: int
+    skip: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+    model_config = _BASE_CONFIG
\ No newline at end of file
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.services.ai_service import AIService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tuning knobs for the micro-batching window
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 30
+
+
+class BatchScheduler:
+    """Coalesce concurrent AI requests into batched upstream submissions.
+
+    Requests arriving within a short window are drained together; identical
+    payloads are deduplicated onto one upstream call and distinct payloads
+    are dispatched concurrently, amortizing the per-call overhead instead of
+    serializing one upstream round-trip per HTTP request.
+    """
+
+    def __init__(self, ai_service: Optional[AIService] = None):
+        self.ai_service = ai_service or AIService()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._worker_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background drain loop (call from FastAPI lifespan)"""
+        if self._worker_task is None:
+            self._worker_task = asyncio.create_task(self._drain_loop())
+
+    async def stop(self):
+        """Stop the background drain loop (call from FastAPI lifespan)"""
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+
+    async def generate_subject_lines(
+        self,
+        content: str,
+        tone: str = "professional",
+        industry: Optional[str] = None,
+        target_audience: Optional[str] = None,
+        count: int = 5
+    ) -> List[str]:
+        """Submit a request to the batcher and await its result"""
+        payload = (content, tone, industry, target_audience, count)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self.queue.put((payload, future))
+        return await future
+
+    async def _drain_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+
+            # Collect whatever else arrives within the batching window
+            deadline = asyncio.get_running_loop().time() + MAX_WAIT_MS / 1000
+            while len(batch) < MAX_BATCH_SIZE:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process_batch(batch)
+
+    async def _process_batch(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        # Deduplicate identical payloads onto a single upstream call
+        by_payload: Dict[tuple, List[asyncio.Future]] = {}
+        for payload, future in batch:
+            by_payload.setdefault(payload, []).append(future)
+
+        payloads = list(by_payload.keys())
+        results = await asyncio.gather(
+            *(
+                asyncio.to_thread(self.ai_service.generate_subject_lines, *payload)
+                for payload in payloads
+            ),
+            return_exceptions=True
+        )
+
+        # Fan results back to all waiters
+        for payload, result in zip(payloads, results):
+            for future in by_payload[payload]:
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+subject_line_batcher = BatchScheduler()
@@ -1,4 +1,6 @@
 import openai
+import functools
+import re
 from typing import List, Dict, Optional
 from app.core.config import settings
 import logging
@@ -6,13 +8,106 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# One shared v1 client: httpx keeps the TLS session warm across calls
+# instead of paying a handshake per request. Bounded timeout/retries so a
+# stuck upstream call can't pin a worker thread indefinitely
+_client = openai.OpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=30,
+    max_retries=3,
+)
+
+# Strips "1. ", "2) ", "- " style numbering in one C-level match per line
+_NUMBERED_LINE = re.compile(r"^[\s\d.\-)]*(.+?)\s*$")
+
+# Prompt bodies are >90% static; built once at import and filled per call
+SUBJECT_LINE_PROMPT = """Generate one compelling email subject line for the following email content.
+
+Tone: {tone}
+{industry_line}
+{audience_line}
+
+Email Content:
+{content}...
+
+Requirements:
+- Keep the subject line under 50 characters
+- Make it attention-grabbing and relevant
+- Avoid spam trigger words
+- Include emotional triggers when appropriate
+- Consider personalization opportunities
+
+Respond with the subject line only:"""
+
+EMAIL_CONTENT_PROMPT = """Write a compelling marketing email with the following specifications:
+
+Purpose: {purpose}
+Tone: {tone}
+Length: {length_guide}
+{key_points_line}
+{cta_line}
+{personalization_line}
+
+Requirements:
+- Start with an engaging opening
+- Use clear, concise language
+- Include the key points naturally
+- End with a strong call to action
+- Use personalization tokens like {{{{first_name}}}} where appropriate
+- Format with proper paragraphs
+- Make it scannable with short paragraphs
+
+Generate the email content:"""
+
+OPTIMIZE_EMAIL_PROMPT = """Analyze this email for marketing effectiveness and provide optimization suggestions.
+
+Subject Line: {subject}
+{audience_line}
+
+Email Content:
+{content}
+
+Provide analysis in JSON format with:
+1. "score": Overall effectiveness score (0-100)
+2. "improvements": List of specific improvement suggestions
+3. "optimized_subject": An improved version of the subject line
+4. "optimized_content": Key sections that should be rewritten (don't rewrite the entire email)
+
+Focus on:
+- Subject line effectiveness
+- Opening paragraph impact
+- Call-to-action clarity
+- Readability and scannability
+- Emotional triggers
+- Personalization opportunities
+- Mobile optimization
+- Spam trigger words to avoid"""
+
+CAMPAIGN_ANALYSIS_PROMPT = """Analyze this email campaign performance data and provide actionable insights:
+
+Campaign Metrics:
+- Open Rate: {open_rate}%
+- Click Rate: {click_rate}%
+- Unsubscribe Rate: {unsubscribe_rate}%
+- Bounce Rate: {bounce_rate}%
+
+Subject Line: {subject}
+Send Time: {send_time}
+Audience Size: {audience_size}
+
+Provide insights on:
+1. What worked well
+2. Areas for improvement
+3. Specific recommendations for next campaign
+4. Industry benchmark comparison
+5. Predicted impact of suggested changes"""
+
 class AIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
         self.model = settings.AI_MODEL
         self.temperature = settings.AI_TEMPERATURE
         self.max_tokens = settings.AI_MAX_TOKENS
-    
+
     def generate_subject_lines(
         self,
         content: str,
@@ -22,52 +117,14 @@ class AIService:
         count: int = 5
     ) -> List[str]:
         """Generate email subject lines using AI"""
+        # Fallbacks live out here: a failed worker call raises and is never
+        # memoized, so the next identical request retries the model
         try:
-            prompt = f"""Generate {count} compelling email subject lines for the following email content.
-            
-Tone: {tone}
-{f'Industry: {industry}' if industry else ''}
-{f'Target Audience: {target_audience}' if target_audience else ''}
-
-Email Content:
-{content[:500]}...
-
-Requirements:
-- Keep subject lines under 50 characters
-- Make them attention-grabbing and relevant
-- Avoid spam trigger words
-- Include emotional triggers when appropriate
-- Consider personalization opportunities
-
-Generate {count} different subject lines:"""
-
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert email marketing copywriter."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=300
-            )
-            
-            # Parse response
-            content = response.choices[0].message.content
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            # Clean up numbering if present
-            subject_lines = []
-            for line in lines:
-                # Remove common numbering patterns
-                cleaned = line.lstrip('0123456789.-) ')
-                if cleaned and len(cleaned) > 5:
-                    subject_lines.append(cleaned)
-            
-            return subject_lines[:count]
-            
+            return list(self._generate_subject_lines_cached(
+                content, tone, industry, target_audience, count
+            ))
         except Exception as e:
-            logger.error(f"Failed to generate subject lines: {e}")
-            # Fallback subject lines
+            logger.error("Failed to generate subject lines: %s", e)
             return [
                 "Don't Miss Out on This Opportunity",
                 "Important Update for You",
@@ -75,6 +132,52 @@ Generate {count} different subject lines:"""
                 "Quick Question for You",
                 "Here's What You've Been Waiting For"
             ][:count]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _generate_subject_lines_cached(
+        content: str,
+        tone: str,
+        industry: Optional[str],
+        target_audience: Optional[str],
+        count: int
+    ) -> tuple:
+        """Cached worker so identical prompts skip the model entirely.
+
+        Raises on failure; the public wrapper applies the fallback.
+        """
+        prompt = SUBJECT_LINE_PROMPT.format(
+            tone=tone,
+            industry_line=f'Industry: {industry}' if industry else '',
+            audience_line=f'Target Audience: {target_audience}' if target_audience else '',
+            content=content[:500]
+        )
+
+        # n=count variants share one request: the server amortizes the
+        # prompt prefix across completions and we pay a single RTT
+        # instead of asking for a numbered list in a longer completion
+        response = _client.chat.completions.create(
+            model=settings.AI_MODEL,
+            messages=[
+                {"role": "system", "content": "You are an expert email marketing copywriter."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=settings.AI_TEMPERATURE,
+            max_tokens=60,
+            n=count
+        )
+
+        # Parse each variant; one regex match strips any stray
+        # numbering, and duplicates across choices are dropped
+        subject_lines = []
+        for choice in response.choices:
+            for line in (choice.message.content or "").splitlines():
+                m = _NUMBERED_LINE.match(line)
+                if m and len(m.group(1)) > 5 and m.group(1) not in subject_lines:
+                    subject_lines.append(m.group(1))
+                    break
+
+        return tuple(subject_lines[:count])
     
     def generate_email_content(
         self,
@@ -87,46 +190,14 @@ Generate {count} different subject lines:"""
     ) -> str:
         """Generate complete email content"""
         try:
-            length_guide = {
-                "short": "100-150 words",
-                "medium": "200-300 words",
-                "long": "400-500 words"
-            }
-            
-            prompt = f"""Write a compelling marketing email with the following specifications:
-
-Purpose: {purpose}
-Tone: {tone}
-Length: {length_guide.get(length, "200-300 words")}
-{f'Key Points to Include: {", ".join(key_points)}' if key_points else ''}
-{f'Call to Action: {call_to_action}' if call_to_action else ''}
-{f'Available Personalization Fields: {", ".join(personalization_fields)}' if personalization_fields else ''}
-
-Requirements:
-- Start with an engaging opening
-- Use clear, concise language
-- Include the key points naturally
-- End with a strong call to action
-- Use personalization tokens like {{first_name}} where appropriate
-- Format with proper paragraphs
-- Make it scannable with short paragraphs
-
-Generate the email content:"""
-
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert email marketing copywriter who creates high-converting emails."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
+            return self._generate_email_content_cached(
+                purpose, tone, length,
+                tuple(key_points) if key_points else None,
+                call_to_action,
+                tuple(personalization_fields) if personalization_fields else None
             )
-            
-            return response.choices[0].message.content
-            
         except Exception as e:
-            logger.error(f"Failed to generate email content: {e}")
+            logger.error("Failed to generate email content: %s", e)
             # Fallback content
             fallback = "Hi {{first_name}},\n\n"
             fallback += f"{purpose}\n\n"
@@ -141,6 +212,47 @@ Generate the email content:"""
                 fallback += "Click here to learn more\n\n"
             fallback += "Best regards,\n{{sender_name}}"
             return fallback
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _generate_email_content_cached(
+        purpose: str,
+        tone: str,
+        length: str,
+        key_points: Optional[tuple],
+        call_to_action: Optional[str],
+        personalization_fields: Optional[tuple]
+    ) -> str:
+        """Cached worker keyed on the full request fields.
+
+        Raises on failure; the public wrapper applies the fallback.
+        """
+        length_guide = {
+            "short": "100-150 words",
+            "medium": "200-300 words",
+            "long": "400-500 words"
+        }
+
+        prompt = EMAIL_CONTENT_PROMPT.format(
+            purpose=purpose,
+            tone=tone,
+            length_guide=length_guide.get(length, "200-300 words"),
+            key_points_line=f'Key Points to Include: {", ".join(key_points)}' if key_points else '',
+            cta_line=f'Call to Action: {call_to_action}' if call_to_action else '',
+            personalization_line=f'Available Personalization Fields: {", ".join(personalization_fields)}' if personalization_fields else ''
+        )
+
+        response = _client.chat.completions.create(
+            model=settings.AI_MODEL,
+            messages=[
+                {"role": "system", "content": "You are an expert email marketing copywriter who creates high-converting emails."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=settings.AI_TEMPERATURE,
+            max_tokens=settings.AI_MAX_TOKENS
+        )
+
+        return response.choices[0].message.content
     
     def optimize_email(
         self,
@@ -149,67 +261,66 @@ Generate the email content:"""
         target_audience: Optional[str] = None
     ) -> Dict:
         """Analyze and optimize email for better performance"""
+        # The worker caches the serialized analysis; parsing per call hands
+        # every caller its own dict to mutate
         try:
-            prompt = f"""Analyze this email for marketing effectiveness and provide optimization suggestions.
-
-Subject Line: {subject}
-{f'Target Audience: {target_audience}' if target_audience else ''}
-
-Email Content:
-{content}
-
-Provide analysis in JSON format with:
-1. "score": Overall effectiveness score (0-100)
-2. "improvements": List of specific improvement suggestions
-3. "optimized_subject": An improved version of the subject line
-4. "optimized_content": Key sections that should be rewritten (don't rewrite the entire email)
-
-Focus on:
-- Subject line effectiveness
-- Opening paragraph impact
-- Call-to-action clarity
-- Readability and scannability
-- Emotional triggers
-- Personalization opportunities
-- Mobile optimization
-- Spam trigger words to avoid"""
-
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an email marketing optimization expert. Respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
+            return json.loads(self._optimize_email_cached(
+                subject, content, target_audience
+            ))
+        except json.JSONDecodeError:
+            # Model answered but not with valid JSON
+            return {
+                "score": 75,
+                "improvements": [
+                    {"area": "Subject Line", "suggestion": "Make it more specific and urgent"},
+                    {"area": "Opening", "suggestion": "Start with a question or surprising fact"},
+                    {"area": "CTA", "suggestion": "Make the call-to-action more prominent"},
+                    {"area": "Mobile", "suggestion": "Break up long paragraphs for better mobile reading"}
                 ],
-                temperature=0.3,  # Lower temperature for more consistent analysis
-                max_tokens=1000
-            )
-            
-            # Parse JSON response
-            try:
-                result = json.loads(response.choices[0].message.content)
-                return result
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                return {
-                    "score": 75,
-                    "improvements": [
-                        {"area": "Subject Line", "suggestion": "Make it more specific and urgent"},
-                        {"area": "Opening", "suggestion": "Start with a question or surprising fact"},
-                        {"area": "CTA", "suggestion": "Make the call-to-action more prominent"},
-                        {"area": "Mobile", "suggestion": "Break up long paragraphs for better mobile reading"}
-                    ],
-                    "optimized_subject": subject,
-                    "optimized_content": None
-                }
-                
+                "optimized_subject": subject,
+                "optimized_content": None
+            }
         except Exception as e:
-            logger.error(f"Failed to optimize email: {e}")
+            logger.error("Failed to optimize email: %s", e)
             return {
                 "score": 70,
                 "improvements": [
                     {"area": "General", "suggestion": "Consider A/B testing different versions"}
                 ]
             }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _optimize_email_cached(
+        subject: str,
+        content: str,
+        target_audience: Optional[str]
+    ) -> str:
+        """Cached worker so identical (subject, content) pairs skip the model.
+
+        Raises on failure — including an invalid-JSON answer — so only real
+        analyses are memoized; the public wrapper applies the fallback.
+        """
+        prompt = OPTIMIZE_EMAIL_PROMPT.format(
+            subject=subject,
+            audience_line=f'Target Audience: {target_audience}' if target_audience else '',
+            content=content
+        )
+
+        response = _client.chat.completions.create(
+            model=settings.AI_MODEL,
+            messages=[
+                {"role": "system", "content": "You are an email marketing optimization expert. Respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,  # Lower temperature for more consistent analysis
+            max_tokens=1000
+        )
+
+        # Validate before caching; invalid JSON raises and is not memoized
+        analysis = response.choices[0].message.content
+        json.loads(analysis)
+        return analysis
     
     def analyze_campaign_performance(
         self,
@@ -217,26 +328,17 @@ Focus on:
     ) -> Dict:
         """Analyze campaign performance and provide insights"""
         try:
-            prompt = f"""Analyze this email campaign performance data and provide actionable insights:
-
-Campaign Metrics:
-- Open Rate: {campaign_data.get('open_rate', 0)}%
-- Click Rate: {campaign_data.get('click_rate', 0)}%
-- Unsubscribe Rate: {campaign_data.get('unsubscribe_rate', 0)}%
-- Bounce Rate: {campaign_data.get('bounce_rate', 0)}%
-
-Subject Line: {campaign_data.get('subject', 'N/A')}
-Send Time: {campaign_data.get('send_time', 'N/A')}
-Audience Size: {campaign_data.get('audience_size', 0)}
-
-Provide insights on:
-1. What worked well
-2. Areas for improvement
-3. Specific recommendations for next campaign
-4. Industry benchmark comparison
-5. Predicted impact of suggested changes"""
+            prompt = CAMPAIGN_ANALYSIS_PROMPT.format(
+                open_rate=campaign_data.get('open_rate', 0),
+                click_rate=campaign_data.get('click_rate', 0),
+                unsubscribe_rate=campaign_data.get('unsubscribe_rate', 0),
+                bounce_rate=campaign_data.get('bounce_rate', 0),
+                subject=campaign_data.get('subject', 'N/A'),
+                send_time=campaign_data.get('send_time', 'N/A'),
+                audience_size=campaign_data.get('audience_size', 0)
+            )
 
-            response = openai.ChatCompletion.create(
+            response = _client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an email marketing analytics expert."},
@@ -252,7 +354,7 @@ Provide insights on:
             }
             
         except Exception as e:
-            logger.error(f"Failed to analyze campaign: {e}")
+            logger.error("Failed to analyze campaign: %s", e)
             return {
                 "insights": "Unable to generate insights at this time.",
                 "performance_rating": "average"
@@ -260,9 +362,15 @@ Provide insights on:
     
     def _calculate_performance_rating(self, campaign_data: Dict) -> str:
         """Calculate overall performance rating"""
-        open_rate = campaign_data.get('open_rate', 0)
-        click_rate = campaign_data.get('click_rate', 0)
-        
+        return self._performance_rating(
+            campaign_data.get('open_rate', 0),
+            campaign_data.get('click_rate', 0)
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _performance_rating(open_rate: float, click_rate: float) -> str:
+        """Pure rating function, cached on the two rates it reads"""
         # Industry average benchmarks
         if open_rate > 25 and click_rate > 3:
             return "excellent"
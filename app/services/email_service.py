@@ -1,157 +1,235 @@
 import resend
 from typing import List, Dict, Optional
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.models import Campaign, Contact, Email, EmailEvent, CampaignStatus
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
+import asyncio
 import logging
 import re
 
 logger = logging.getLogger(__name__)
 
+# Resend's batch endpoint takes up to 100 messages per HTTP call
+BATCH_SIZE = 100
+# Bound on batches in flight at once
+MAX_CONCURRENT_BATCHES = 8
+
+# Transactional HTML skeletons are static apart from the link; built once
+# at import and filled with a single % interpolation per send instead of
+# re-assembling the markup every call
+_VERIFY_HTML = """
+<h2>Welcome to AI Email Marketing Assistant!</h2>
+<p>Please verify your email address to get started.</p>
+<p>
+    <a href="%(url)s" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
+        Verify Email
+    </a>
+</p>
+<p>Or copy this link: %(url)s</p>
+<p>This link will expire in 24 hours.</p>
+"""
+
+_RESET_HTML = """
+<h2>Password Reset Request</h2>
+<p>You requested to reset your password. Click the button below to create a new password.</p>
+<p>
+    <a href="%(url)s" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
+        Reset Password
+    </a>
+</p>
+<p>Or copy this link: %(url)s</p>
+<p>This link will expire in 24 hours. If you didn't request this, please ignore this email.</p>
+"""
+
 class EmailService:
+    # Link prefixes are fixed per deployment; computed once instead of a
+    # settings lookup and f-string assembly per send
+    _VERIFY_URL_PREFIX = f"{settings.APP_URL}/verify-email?token="
+    _RESET_URL_PREFIX = f"{settings.APP_URL}/reset-password?token="
+
     def __init__(self):
         resend.api_key = settings.RESEND_API_KEY
         self.from_email = settings.FROM_EMAIL
-    
+
     def send_verification_email(self, email: str, verification_token: str):
         """Send email verification"""
         try:
-            verification_url = f"{settings.APP_URL}/verify-email?token={verification_token}"
-            
-            html_content = f"""
-            <h2>Welcome to AI Email Marketing Assistant!</h2>
-            <p>Please verify your email address to get started.</p>
-            <p>
-                <a href="{verification_url}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
-                    Verify Email
-                </a>
-            </p>
-            <p>Or copy this link: {verification_url}</p>
-            <p>This link will expire in 24 hours.</p>
-            """
-            
+            verification_url = self._VERIFY_URL_PREFIX + verification_token
+
             response = resend.Emails.send({
                 "from": self.from_email,
                 "to": email,
                 "subject": "Verify your email - AI Email Marketing Assistant",
-                "html": html_content
+                "html": _VERIFY_HTML % {"url": verification_url}
             })
             
-            logger.info(f"Verification email sent to {email}")
+            logger.info("Verification email sent to %s", email)
             return response
             
         except Exception as e:
-            logger.error(f"Failed to send verification email: {e}")
+            logger.error("Failed to send verification email: %s", e)
             raise
     
     def send_password_reset_email(self, email: str, reset_token: str):
         """Send password reset email"""
         try:
-            reset_url = f"{settings.APP_URL}/reset-password?token={reset_token}"
-            
-            html_content = f"""
-            <h2>Password Reset Request</h2>
-            <p>You requested to reset your password. Click the button below to create a new password.</p>
-            <p>
-                <a href="{reset_url}" style="background-color: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
-                    Reset Password
-                </a>
-            </p>
-            <p>Or copy this link: {reset_url}</p>
-            <p>This link will expire in 24 hours. If you didn't request this, please ignore this email.</p>
-            """
-            
+            reset_url = self._RESET_URL_PREFIX + reset_token
+
             response = resend.Emails.send({
                 "from": self.from_email,
                 "to": email,
                 "subject": "Password Reset - AI Email Marketing Assistant",
-                "html": html_content
+                "html": _RESET_HTML % {"url": reset_url}
             })
             
-            logger.info(f"Password reset email sent to {email}")
+            logger.info("Password reset email sent to %s", email)
             return response
             
         except Exception as e:
-            logger.error(f"Failed to send password reset email: {e}")
+            logger.error("Failed to send password reset email: %s", e)
             raise
     
-    def send_campaign(self, campaign_id: int, db: Session):
-        """Send campaign emails"""
-        try:
-            # Get campaign and emails
-            campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    def _build_payload(
+        self,
+        campaign: Campaign,
+        email_record: Email,
+        subject_segments,
+        content_segments
+    ) -> Dict:
+        contact = email_record.contact
+        return {
+            "from": f"{campaign.from_name} <{campaign.from_email}>",
+            "to": contact.email,
+            "subject": self._render_segments(subject_segments, contact),
+            "html": self._render_segments(content_segments, contact),
+            "headers": {
+                "X-Campaign-ID": str(campaign.id),
+                "X-Email-ID": str(email_record.id),
+                "List-Unsubscribe": f"<{settings.APP_URL}/unsubscribe?email={contact.email}&campaign={campaign.id}>"
+            }
+        }
+
+    async def send_campaign(self, campaign_id: int):
+        """Send campaign emails via the Resend batch API.
+
+        Recipients go out in batches of 100 with a bounded number of batch
+        calls in flight, so wall time scales with N/100 round-trips instead
+        of one per recipient. Opens its own session: it runs as a
+        background task after the request session is gone.
+        """
+        async with AsyncSessionLocal() as db:
+            campaign = (await db.execute(
+                select(Campaign).where(Campaign.id == campaign_id)
+            )).scalar_one_or_none()
             if not campaign:
-                logger.error(f"Campaign {campaign_id} not found")
+                logger.error("Campaign %s not found", campaign_id)
                 return
-            
-            # Update campaign status
-            campaign.status = CampaignStatus.SENDING
-            db.commit()
-            
-            # Get emails to send
-            emails = db.query(Email).filter(
-                Email.campaign_id == campaign_id,
-                Email.status == "pending"
-            ).all()
-            
-            sent_count = 0
-            failed_count = 0
-            
-            for email_record in emails:
-                try:
-                    # Get contact
-                    contact = email_record.contact
-                    
-                    # Personalize content
-                    personalized_content = self._personalize_content(
-                        campaign.content,
-                        contact
+
+            try:
+                # Update campaign status
+                campaign.status = CampaignStatus.SENDING
+                await db.commit()
+
+                semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+                # The token positions are fixed per campaign: split subject
+                # and content into segments once, so each recipient costs a
+                # join with dict lookups instead of a fresh regex scan and
+                # replacement-dict build
+                subject_segments = self._compile_template(campaign.subject)
+                content_segments = self._compile_template(campaign.content)
+
+                async def send_batch(batch):
+                    payloads = [
+                        self._build_payload(
+                            campaign, email_record,
+                            subject_segments, content_segments
+                        )
+                        for email_record in batch
+                    ]
+                    async with semaphore:
+                        # The SDK is sync; run it in a worker thread so
+                        # batches overlap on network latency
+                        try:
+                            response = await asyncio.to_thread(resend.Batch.send, payloads)
+                        except Exception as exc:
+                            logger.error("Batch send failed for campaign %s: %s", campaign_id, exc)
+                            return batch, exc
+                    return batch, response
+
+                # Contacts come along in one extra query instead of a lazy
+                # SELECT per recipient; the server-side cursor streams rows
+                # so million-recipient campaigns never materialize at once
+                result = await db.stream(
+                    select(Email)
+                    .options(selectinload(Email.contact))
+                    .where(
+                        Email.campaign_id == campaign_id,
+                        Email.status == "pending"
                     )
-                    
-                    # Send email
-                    response = resend.Emails.send({
-                        "from": f"{campaign.from_name} <{campaign.from_email}>",
-                        "to": contact.email,
-                        "subject": self._personalize_content(campaign.subject, contact),
-                        "html": personalized_content,
-                        "headers": {
-                            "X-Campaign-ID": str(campaign_id),
-                            "X-Email-ID": str(email_record.id),
-                            "List-Unsubscribe": f"<{settings.APP_URL}/unsubscribe?email={contact.email}&campaign={campaign_id}>"
-                        }
-                    })
-                    
-                    # Update email record
-                    email_record.message_id = response['id']
-                    email_record.status = "sent"
-                    email_record.sent_at = datetime.utcnow()
-                    sent_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Failed to send email to {contact.email}: {e}")
-                    email_record.status = "failed"
-                    failed_count += 1
-                
-                # Commit batch
-                if (sent_count + failed_count) % 50 == 0:
-                    db.commit()
-            
-            # Final commit
-            db.commit()
-            
-            # Update campaign
-            campaign.status = CampaignStatus.SENT
-            campaign.sent_at = datetime.utcnow()
-            db.commit()
-            
-            logger.info(f"Campaign {campaign_id} sent. Success: {sent_count}, Failed: {failed_count}")
-            
-        except Exception as e:
-            logger.error(f"Failed to send campaign {campaign_id}: {e}")
-            campaign.status = CampaignStatus.FAILED
-            db.commit()
-            raise
+                    .execution_options(yield_per=BATCH_SIZE)
+                )
+
+                tasks = []
+                batch = []
+                async for email_record in result.scalars():
+                    batch.append(email_record)
+                    if len(batch) == BATCH_SIZE:
+                        tasks.append(asyncio.create_task(send_batch(batch)))
+                        batch = []
+                if batch:
+                    tasks.append(asyncio.create_task(send_batch(batch)))
+
+                results = await asyncio.gather(*tasks)
+
+                sent_count = 0
+                failed_count = 0
+                now = datetime.utcnow()
+                rows = []
+
+                for batch, response in results:
+                    if isinstance(response, Exception):
+                        # Keys must match the sent rows for executemany
+                        rows.extend(
+                            {"id": email_record.id, "message_id": None,
+                             "status": "failed", "sent_at": None}
+                            for email_record in batch
+                        )
+                        failed_count += len(batch)
+                        continue
+
+                    sent = response.get("data", []) if isinstance(response, dict) else response
+                    for email_record, item in zip(batch, sent):
+                        rows.append({
+                            "id": email_record.id,
+                            "message_id": item.get("id"),
+                            "status": "sent",
+                            "sent_at": now
+                        })
+                        sent_count += 1
+
+                # One executemany UPDATE keyed on id instead of per-row
+                # ORM writes
+                if rows:
+                    await db.execute(update(Email), rows)
+
+                # Update campaign
+                campaign.status = CampaignStatus.SENT
+                campaign.sent_at = datetime.utcnow()
+                await db.commit()
+
+                logger.info("Campaign %s sent. Success: %s, Failed: %s", campaign_id, sent_count, failed_count)
+
+            except Exception as e:
+                logger.error("Failed to send campaign %s: %s", campaign_id, e)
+                await db.rollback()
+                campaign.status = CampaignStatus.FAILED
+                db.add(campaign)
+                await db.commit()
+                raise
     
     def send_test_email(self, campaign: Campaign, test_email: str):
         """Send test email for campaign"""
@@ -183,32 +261,72 @@ class EmailService:
                 "html": html_content
             })
             
-            logger.info(f"Test email sent to {test_email}")
+            logger.info("Test email sent to %s", test_email)
             return response
             
         except Exception as e:
-            logger.error(f"Failed to send test email: {e}")
+            logger.error("Failed to send test email: %s", e)
             raise
     
+    # Matches {{token}}; compiled once so personalization is a single
+    # C-level scan instead of one str.replace pass per token
+    _TOKEN_RE = re.compile(r"\{\{(\w+)\}\}")
+
+    # Token -> getter; only tokens the template actually contains are
+    # evaluated per recipient
+    _TOKEN_GETTERS = {
+        "first_name": lambda c: c.first_name or "there",
+        "last_name": lambda c: c.last_name or "",
+        "full_name": lambda c: f"{c.first_name or ''} {c.last_name or ''}".strip() or "there",
+        "email": lambda c: c.email,
+        "company": lambda c: c.company or "your company",
+    }
+
+    @classmethod
+    def _compile_template(cls, content: str):
+        """Split content once into literal and (token, raw) segments.
+
+        Token-free templates (static newsletters) come back as the original
+        string so rendering degenerates to returning it — no per-recipient
+        scan or join over the HTML bytes at all.
+        """
+        segments = []
+        pos = 0
+        for m in cls._TOKEN_RE.finditer(content):
+            if m.start() > pos:
+                segments.append(content[pos:m.start()])
+            segments.append((m.group(1), m.group(0)))
+            pos = m.end()
+        if pos == 0:
+            return content
+        if pos < len(content):
+            segments.append(content[pos:])
+        return segments
+
+    @classmethod
+    def _render_segments(cls, segments, contact: Contact) -> str:
+        if isinstance(segments, str):
+            return segments
+        custom_fields = contact.custom_fields or {}
+        parts = []
+        for seg in segments:
+            if isinstance(seg, str):
+                parts.append(seg)
+                continue
+            name, raw = seg
+            getter = cls._TOKEN_GETTERS.get(name)
+            if getter is not None:
+                parts.append(getter(contact))
+            elif name in custom_fields:
+                parts.append(str(custom_fields[name]))
+            else:
+                # Unknown tokens stay as-is, same as before
+                parts.append(raw)
+        return "".join(parts)
+
     def _personalize_content(self, content: str, contact: Contact) -> str:
         """Replace personalization tokens with contact data"""
-        replacements = {
-            "{{first_name}}": contact.first_name or "there",
-            "{{last_name}}": contact.last_name or "",
-            "{{full_name}}": f"{contact.first_name or ''} {contact.last_name or ''}".strip() or "there",
-            "{{email}}": contact.email,
-            "{{company}}": contact.company or "your company"
-        }
-        
-        # Add custom fields
-        for key, value in (contact.custom_fields or {}).items():
-            replacements[f"{{{{{key}}}}}"] = str(value)
-        
-        # Replace tokens
-        for token, value in replacements.items():
-            content = content.replace(token, value)
-        
-        return content
+        return self._render_segments(self._compile_template(content), contact)
     
     def track_email_event(
         self,
@@ -228,43 +346,74 @@ class EmailService:
                 user_agent=metadata.get('user_agent') if metadata else None
             )
             db.add(event)
-            
-            # Update email record
-            email = db.query(Email).filter(Email.id == email_id).first()
-            if email:
-                if event_type == "open":
-                    if not email.opened_at:
-                        email.opened_at = datetime.utcnow()
-                    email.open_count += 1
-                elif event_type == "click":
-                    if not email.clicked_at:
-                        email.clicked_at = datetime.utcnow()
-                    email.click_count += 1
-                elif event_type == "unsubscribe":
-                    email.unsubscribed_at = datetime.utcnow()
-                elif event_type == "bounce":
-                    email.bounced_at = datetime.utcnow()
-                elif event_type == "complaint":
-                    email.complained_at = datetime.utcnow()
-                
-                # Update campaign stats
-                campaign = email.campaign
-                if campaign:
-                    if event_type == "open":
-                        campaign.opens_count = db.query(Email).filter(
-                            Email.campaign_id == campaign.id,
-                            Email.opened_at.isnot(None)
-                        ).count()
-                    elif event_type == "click":
-                        campaign.clicks_count = db.query(Email).filter(
-                            Email.campaign_id == campaign.id,
-                            Email.clicked_at.isnot(None)
-                        ).count()
-            
+
+            # Update email record with plain UPDATEs: no SELECT round-trip,
+            # and the first-open/first-click claim is decided by the
+            # `WHERE ..._at IS NULL` predicate atomically in the database,
+            # so two concurrent pixel hits cannot both bump the campaign
+            # counter
+            now = datetime.utcnow()
+            if event_type == "open":
+                campaign_id = db.execute(
+                    update(Email)
+                    .where(Email.id == email_id, Email.opened_at.is_(None))
+                    .values(opened_at=now, open_count=Email.open_count + 1)
+                    .returning(Email.campaign_id)
+                ).scalar_one_or_none()
+                if campaign_id is not None:
+                    db.execute(
+                        update(Campaign)
+                        .where(Campaign.id == campaign_id)
+                        .values(opens_count=Campaign.opens_count + 1)
+                    )
+                else:
+                    db.execute(
+                        update(Email)
+                        .where(Email.id == email_id)
+                        .values(open_count=Email.open_count + 1)
+                    )
+            elif event_type == "click":
+                campaign_id = db.execute(
+                    update(Email)
+                    .where(Email.id == email_id, Email.clicked_at.is_(None))
+                    .values(clicked_at=now, click_count=Email.click_count + 1)
+                    .returning(Email.campaign_id)
+                ).scalar_one_or_none()
+                if campaign_id is not None:
+                    db.execute(
+                        update(Campaign)
+                        .where(Campaign.id == campaign_id)
+                        .values(clicks_count=Campaign.clicks_count + 1)
+                    )
+                else:
+                    db.execute(
+                        update(Email)
+                        .where(Email.id == email_id)
+                        .values(click_count=Email.click_count + 1)
+                    )
+            elif event_type == "unsubscribe":
+                db.execute(
+                    update(Email)
+                    .where(Email.id == email_id)
+                    .values(unsubscribed_at=now)
+                )
+            elif event_type == "bounce":
+                db.execute(
+                    update(Email)
+                    .where(Email.id == email_id)
+                    .values(bounced_at=now)
+                )
+            elif event_type == "complaint":
+                db.execute(
+                    update(Email)
+                    .where(Email.id == email_id)
+                    .values(complained_at=now)
+                )
+
             db.commit()
             
         except Exception as e:
-            logger.error(f"Failed to track email event: {e}")
+            logger.error("Failed to track email event: %s", e)
             if db:
                 db.rollback()
             raise
\ No newline at end of file
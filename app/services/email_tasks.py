@@ -0,0 +1,23 @@
+from app.core.celery_app import celery_app
+from app.services.email_service import EmailService
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name="send_verification_email", bind=True, max_retries=3, default_retry_delay=30)
+def send_verification_email(self, email: str, verification_token: str):
+    """Send the verification email from a worker process"""
+    try:
+        EmailService().send_verification_email(email, verification_token)
+    except Exception as exc:
+        logger.error("Verification email task failed for %s: %s", email, exc)
+        raise self.retry(exc=exc)
+
+@celery_app.task(name="send_password_reset_email", bind=True, max_retries=3, default_retry_delay=30)
+def send_password_reset_email(self, email: str, reset_token: str):
+    """Send the password reset email from a worker process"""
+    try:
+        EmailService().send_password_reset_email(email, reset_token)
+    except Exception as exc:
+        logger.error("Password reset email task failed for %s: %s", email, exc)
+        raise self.retry(exc=exc)
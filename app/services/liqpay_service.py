@@ -1,13 +1,42 @@
 import hashlib
+import hmac
 import base64
 import json
+import requests
+from requests.adapters import HTTPAdapter, Retry
 from typing import Dict, Optional
 from app.core.config import settings
+import itertools
 import logging
 import time
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
+# Константні частини URL збираються один раз при імпорті, а не на кожен платіж
+WEBHOOK_URL = f'{settings.API_URL}/api/v1/webhooks/liqpay'
+RESULT_URL_PREFIX = f'{settings.APP_URL}/payment/success?order_id='
+API_REQUEST_URL = 'https://www.liqpay.ua/api/request'
+
+# Лічильник у межах процесу: два платежі одного користувача в одну секунду
+# більше не отримують однаковий order_id
+_order_seq = itertools.count()
+CHECKOUT_URL_PREFIX = 'https://www.liqpay.ua/api/3/checkout?'
+
+def _build_session() -> requests.Session:
+    """Спільна сесія з keep-alive: без нового TCP+TLS handshake на кожен запит"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504]
+        )
+    ))
+    return session
+
 class LiqPay:
     """Простий LiqPay клас без зовнішньої бібліотеки"""
     def __init__(self, public_key: str, private_key: str):
@@ -28,12 +57,24 @@ class LiqPay:
         return base64.b64encode(hashlib.sha1(string.encode('utf-8')).digest()).decode('utf-8')
 
 class LiqPayService:
+    # Одна сесія на процес: сервіс створюється в кількох модулях,
+    # тож пул з'єднань тримаємо на рівні класу
+    _session = _build_session()
+
     def __init__(self):
         self.liqpay = LiqPay(
             public_key=settings.LIQPAY_PUBLIC_KEY,
             private_key=settings.LIQPAY_PRIVATE_KEY
         )
         self.sandbox_mode = settings.LIQPAY_SANDBOX_MODE
+        # Прапорець sandbox обчислюється один раз, а не на кожен платіж
+        self._sandbox_flag = '1' if self.sandbox_mode else '0'
+        # SHA-1 стан із уже обробленим приватним ключем: на кожен колбек
+        # копіюється готовий стан замість повторного хешування префікса.
+        # Ключ кодується в bytes один раз; usedforsecurity=False дозволяє
+        # OpenSSL обрати найшвидшу реалізацію (SHA-NI на сучасних x86)
+        self._pk_bytes = settings.LIQPAY_PRIVATE_KEY.encode('utf-8')
+        self._sign_prefix = hashlib.sha1(self._pk_bytes, usedforsecurity=False)
     
     def create_subscription_payment(
         self,
@@ -43,7 +84,7 @@ class LiqPayService:
         amount: float
     ) -> Dict:
         """Створити платіж для підписки"""
-        order_id = f"sub_{user_id}_{plan}_{int(time.time())}"
+        order_id = f"sub_{user_id}_{plan}_{time.time_ns() // 10**9}_{next(_order_seq)}"
         
         params = {
             'action': 'subscribe',
@@ -52,11 +93,11 @@ class LiqPayService:
             'description': f'Підписка "{plan.title()}" - AI Email Marketing',
             'order_id': order_id,
             'version': '3',
-            'sandbox': '1' if self.sandbox_mode else '0',
+            'sandbox': self._sandbox_flag,
             'subscribe_periodicity': 'month',
             'subscribe_date_start': None,  # Почати одразу
-            'result_url': f'{settings.APP_URL}/payment/success?order_id={order_id}',
-            'server_url': f'{settings.API_URL}/api/v1/webhooks/liqpay',
+            'result_url': RESULT_URL_PREFIX + order_id,
+            'server_url': WEBHOOK_URL,
             'customer': email,
             'customer_user_id': str(user_id),
             'product_name': f'Підписка {plan.title()}',
@@ -69,7 +110,7 @@ class LiqPayService:
         return {
             'data': data,
             'signature': signature,
-            'checkout_url': f'https://www.liqpay.ua/api/3/checkout?data={data}&signature={signature}',
+            'checkout_url': CHECKOUT_URL_PREFIX + urlencode({'data': data, 'signature': signature}),
             'order_id': order_id
         }
     
@@ -82,7 +123,7 @@ class LiqPayService:
         months: int = 1
     ) -> Dict:
         """Створити одноразовий платіж"""
-        order_id = f"pay_{user_id}_{plan}_{int(time.time())}"
+        order_id = f"pay_{user_id}_{plan}_{time.time_ns() // 10**9}_{next(_order_seq)}"
         
         params = {
             'action': 'pay',
@@ -91,9 +132,9 @@ class LiqPayService:
             'description': f'Оплата {months} міс. тарифу "{plan.title()}"',
             'order_id': order_id,
             'version': '3',
-            'sandbox': '1' if self.sandbox_mode else '0',
-            'result_url': f'{settings.APP_URL}/payment/success?order_id={order_id}',
-            'server_url': f'{settings.API_URL}/api/v1/webhooks/liqpay',
+            'sandbox': self._sandbox_flag,
+            'result_url': RESULT_URL_PREFIX + order_id,
+            'server_url': WEBHOOK_URL,
             'customer': email,
             'customer_user_id': str(user_id),
             'product_name': f'Тариф {plan.title()} ({months} міс.)',
@@ -106,60 +147,53 @@ class LiqPayService:
         return {
             'data': data,
             'signature': signature,
-            'checkout_url': f'https://www.liqpay.ua/api/3/checkout?data={data}&signature={signature}',
+            'checkout_url': CHECKOUT_URL_PREFIX + urlencode({'data': data, 'signature': signature}),
             'order_id': order_id
         }
     
     def verify_callback(self, data: str, signature: str) -> bool:
         """Перевірити підпис колбеку"""
-        return signature == self.liqpay.str_to_sign(
-            self.liqpay.private_key + data + self.liqpay.private_key
-        )
+        h = self._sign_prefix.copy()
+        h.update(data.encode('utf-8'))
+        h.update(self._pk_bytes)
+        expected = base64.b64encode(h.digest()).decode('utf-8')
+        # compare_digest: порівняння за сталий час замість раннього виходу ==
+        return hmac.compare_digest(signature, expected)
     
     def decode_callback_data(self, data: str) -> Dict:
         """Декодувати дані колбеку"""
-        decoded = base64.b64decode(data).decode('utf-8')
-        return json.loads(decoded)
+        # json.loads приймає bytes напряму — без проміжного str
+        return json.loads(base64.b64decode(data))
     
+    def _api_request(self, params: Dict) -> Dict:
+        """Підписаний запит до LiqPay API через спільну сесію"""
+        data = self.liqpay.cnb_data(params)
+        signature = self.liqpay.cnb_signature(params)
+
+        response = self._session.post(
+            API_REQUEST_URL,
+            data={'data': data, 'signature': signature},
+            timeout=(3.05, 10)
+        )
+
+        return response.json()
+
     def check_payment_status(self, order_id: str) -> Dict:
         """Перевірити статус платежу"""
-        params = {
+        return self._api_request({
             'action': 'status',
             'version': '3',
             'order_id': order_id
-        }
-        
-        data = self.liqpay.cnb_data(params)
-        signature = self.liqpay.cnb_signature(params)
-        
-        # API запит для перевірки статусу
-        import requests
-        response = requests.post(
-            'https://www.liqpay.ua/api/request',
-            data={'data': data, 'signature': signature}
-        )
-        
-        return response.json()
-    
+        })
+
     def cancel_subscription(self, order_id: str) -> Dict:
         """Скасувати підписку"""
-        params = {
+        return self._api_request({
             'action': 'unsubscribe',
             'version': '3',
             'order_id': order_id
-        }
-        
-        data = self.liqpay.cnb_data(params)
-        signature = self.liqpay.cnb_signature(params)
-        
-        import requests
-        response = requests.post(
-            'https://www.liqpay.ua/api/request',
-            data={'data': data, 'signature': signature}
-        )
-        
-        return response.json()
-    
+        })
+
     def create_refund(self, order_id: str, amount: Optional[float] = None) -> Dict:
         """Створити повернення коштів"""
         params = {
@@ -167,17 +201,13 @@ class LiqPayService:
             'version': '3',
             'order_id': order_id
         }
-        
+
         if amount:
             params['amount'] = amount
-        
-        data = self.liqpay.cnb_data(params)
-        signature = self.liqpay.cnb_signature(params)
-        
-        import requests
-        response = requests.post(
-            'https://www.liqpay.ua/api/request',
-            data={'data': data, 'signature': signature}
-        )
-        
-        return response.json()
\ No newline at end of file
+
+        return self._api_request(params)
+
+    @classmethod
+    def close(cls):
+        """Закрити пул з'єднань (викликається при зупинці застосунку)"""
+        cls._session.close()
\ No newline at end of file
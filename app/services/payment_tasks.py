@@ -0,0 +1,187 @@
+from app.core.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.core.config import settings
+from app.core.redis import subscription_key, user_cache_key
+from app.models.models import User, UserPlan, Payment
+from app.services.liqpay_service import LiqPayService
+from sqlalchemy import update
+from datetime import datetime, timedelta
+import logging
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Місяць передплати; створюється один раз на імпорт, а не на кожну подію
+THIRTY_DAYS = timedelta(days=30)
+
+# Пошук плану по назві через dict замість enum-виклику на кожну подію
+PLAN_BY_NAME = {p.value: p for p in UserPlan}
+
+# Синхронний клієнт для воркера; redis_client з app.core.redis асинхронний
+# і в Celery-задачах не використовується
+sync_redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Один екземпляр на воркер, як у роутерах: конструктор читає налаштування
+# та готує стан підпису, повторювати це на кожну задачу немає сенсу
+liqpay_service = LiqPayService()
+
+# Статуси, після яких платіж більше не змінюється
+TERMINAL_STATUSES = {'success', 'failure', 'error', 'reversed'}
+
+# Ескалаційний розклад повторних опитувань (секунди): швидкі платежі
+# підтверджуються за перші спроби, повільні не створюють зайвих запитів
+_POLL_COUNTDOWNS = (1, 2, 5, 10, 30, 60)
+
+def _invalidate_subscription_cache(user_id: int):
+    """Скинути кеші підписки та користувача після зміни платежу"""
+    try:
+        sync_redis.delete(subscription_key(user_id), user_cache_key(user_id))
+    except Exception as cache_error:
+        logger.warning("Не вдалося скинути кеш підписки: %s", cache_error)
+
+@celery_app.task(name="refresh_payment_status", bind=True, max_retries=3, default_retry_delay=10)
+def refresh_payment_status(self, order_id: str, attempt: int = 0):
+    """Опитати LiqPay та оновити платіж з воркера, а не з запиту"""
+    db = SessionLocal()
+    try:
+        payment = db.query(Payment).filter(
+            Payment.order_id == order_id
+        ).first()
+
+        if not payment:
+            logger.error("Платіж не знайдено для оновлення статусу: %s", order_id)
+            return
+
+        status_data = liqpay_service.check_payment_status(order_id)
+        new_status = status_data.get('status')
+
+        if new_status and new_status != payment.status:
+            now = datetime.utcnow()
+            payment.status = new_status
+
+            if new_status == 'success':
+                # Один UPDATE замість SELECT + присвоєння: міняємо одну
+                # колонку, тягнути весь рядок користувача немає сенсу
+                db.execute(
+                    update(User)
+                    .where(User.id == payment.user_id)
+                    .values(plan=PLAN_BY_NAME[payment.plan])
+                )
+
+                if payment.payment_type == 'subscription':
+                    payment.expires_at = now + THIRTY_DAYS
+                else:
+                    payment.expires_at = now + THIRTY_DAYS * payment.months
+
+            db.commit()
+            _invalidate_subscription_cache(payment.user_id)
+
+        # Вебхук міг загубитися: поки статус нетермінальний, переплановуємо
+        # перевірку за ескалаційним розкладом замість фіксованого інтервалу
+        if (new_status or payment.status) not in TERMINAL_STATUSES \
+                and attempt < len(_POLL_COUNTDOWNS):
+            refresh_payment_status.apply_async(
+                (order_id, attempt + 1),
+                countdown=_POLL_COUNTDOWNS[attempt]
+            )
+    except Exception as exc:
+        db.rollback()
+        logger.error("Помилка фонового оновлення статусу %s: %s", order_id, exc)
+        raise self.retry(exc=exc)
+    finally:
+        db.close()
+
+# Обробники статусів LiqPay; диспетчеризація через dict замість ланцюжка
+# if/elif — O(1) і явний перелік підтримуваних статусів
+
+def _on_success(db, payment, payment_data, now):
+    """Успішний платіж: оновити план одним UPDATE ... RETURNING"""
+    updated_id = db.execute(
+        update(User)
+        .where(User.id == payment.user_id)
+        .values(plan=PLAN_BY_NAME[payment.plan])
+        .returning(User.id)
+    ).scalar_one_or_none()
+
+    if updated_id is not None:
+        # Встановлюємо термін дії
+        if payment.payment_type == 'subscription':
+            payment.expires_at = now + THIRTY_DAYS
+        else:
+            payment.expires_at = now + THIRTY_DAYS * payment.months
+
+        logger.info("Оновлено план користувача %s на %s", updated_id, payment.plan)
+
+def _on_failed(db, payment, payment_data, now):
+    payment.error_description = payment_data.get('err_description')
+    logger.warning("Платіж невдалий: %s, причина: %s", payment.order_id, payment.error_description)
+
+def _on_reversed(db, payment, payment_data, now):
+    # Повертаємо на безкоштовний план одним UPDATE; умова по плану
+    # йде у WHERE, тож зайвого запису не буде
+    reverted_id = db.execute(
+        update(User)
+        .where(User.id == payment.user_id, User.plan != UserPlan.FREE)
+        .values(plan=UserPlan.FREE)
+        .returning(User.id)
+    ).scalar_one_or_none()
+    if reverted_id is not None:
+        logger.info("Користувач %s повернутий на FREE план через refund", reverted_id)
+
+def _on_subscribed(db, payment, payment_data, now):
+    payment.subscription_id = payment_data.get('acq_id')
+    logger.info("Підписка активована: %s", payment.order_id)
+
+def _on_unsubscribed(db, payment, payment_data, now):
+    payment.cancelled_at = now
+    logger.info("Підписка скасована: %s", payment.order_id)
+
+CALLBACK_HANDLERS = {
+    'success': _on_success,
+    'error': _on_failed,
+    'failure': _on_failed,
+    'reversed': _on_reversed,
+    'subscribed': _on_subscribed,
+    'unsubscribed': _on_unsubscribed,
+}
+
+@celery_app.task(name="process_liqpay_callback", bind=True, max_retries=3, default_retry_delay=10)
+def process_liqpay_callback(self, payment_data: dict):
+    """Застосувати перевірений LiqPay колбек до бази з воркера
+
+    Webhook-ендпоінт лише перевіряє підпис і ставить подію в чергу, щоб
+    відповідати LiqPay за мілісекунди незалежно від навантаження на базу.
+    """
+    order_id = payment_data.get('order_id')
+    payment_status = payment_data.get('status')
+
+    db = SessionLocal()
+    try:
+        payment = db.query(Payment).filter(
+            Payment.order_id == order_id
+        ).first()
+
+        if not payment:
+            logger.error("Платіж не знайдено: %s", order_id)
+            return
+
+        # Один виклик utcnow() на подію замість чотирьох
+        now = datetime.utcnow()
+
+        # Оновлюємо статус платежу
+        payment.status = payment_status
+        payment.liqpay_payment_id = payment_data.get('payment_id')
+        payment.updated_at = now
+
+        handler = CALLBACK_HANDLERS.get(payment_status)
+        if handler:
+            handler(db, payment, payment_data, now)
+
+        db.commit()
+        _invalidate_subscription_cache(payment.user_id)
+    except Exception as exc:
+        db.rollback()
+        logger.error("Помилка обробки LiqPay колбеку %s: %s", order_id, exc)
+        raise self.retry(exc=exc)
+    finally:
+        db.close()
@@ -1,42 +1,65 @@
+import atexit
 import logging
+import queue
 import sys
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from app.core.config import settings
 
-def setup_logger(name: str) -> logging.Logger:
-    """Setup logger with console and file handlers"""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG if settings.ENVIRONMENT == "development" else logging.INFO)
-    
-    # Remove existing handlers
-    logger.handlers = []
-    
+# One queue and listener per process: handlers that block on write() (the
+# rotating file handler takes a lock, stdout can stall) run on the listener
+# thread, so a logger call in a request handler is just a queue put
+_log_queue = None
+_listener = None
+
+def _get_log_queue() -> queue.Queue:
+    global _log_queue, _listener
+    if _log_queue is not None:
+        return _log_queue
+
+    _log_queue = queue.Queue(-1)
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.DEBUG)
-    
+
     # File handler
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    
+
     file_handler = RotatingFileHandler(
         log_dir / "app.log",
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=5
     )
     file_handler.setLevel(logging.INFO)
-    
+
     # Formatter
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+
+    _listener = QueueListener(
+        _log_queue, console_handler, file_handler,
+        respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    return _log_queue
+
+def setup_logger(name: str) -> logging.Logger:
+    """Setup logger with queue-fronted console and file handlers"""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG if settings.ENVIRONMENT == "development" else logging.INFO)
+
+    # Remove existing handlers
+    logger.handlers = []
+
+    logger.addHandler(QueueHandler(_get_log_queue()))
+
+    return logger
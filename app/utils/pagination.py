@@ -0,0 +1,18 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}:{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a cursor back to (created_at, id); returns None if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        ts, _, row_id = raw.rpartition(':')
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
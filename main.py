@@ -1,26 +1,60 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
+from typing import List
+
+import httpx
 from app.core.config import settings
 from app.core.database import engine, Base
+from sqlalchemy import text
 from app.api.v1 import auth, users, campaigns, contacts, templates, analytics, payments_liqpay, webhooks_liqpay
 from app.api.v1.ai import ai_router
+from app.schemas.schemas import BatchSubRequest
 from app.core.security import get_current_user
 from app.utils.logger import setup_logger
 
 # Setup logging
 logger = setup_logger(__name__)
 
+# Arbitrary but stable key for the schema-creation advisory lock
+SCHEMA_LOCK_KEY = 918273
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Create database tables in development only; every create_all run
+    # reflects the schema table by table, and a rolling deploy would fire
+    # that from every worker at once. Production schema comes from the
+    # one-shot migrate.py (or RUN_MIGRATIONS=1 for an explicit override)
+    if settings.ENVIRONMENT == "development" or os.getenv("RUN_MIGRATIONS") == "1":
+        # Advisory lock so only the first worker pays the per-table
+        # introspection; the rest find the lock taken and skip
+        with engine.connect() as conn:
+            got_lock = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": SCHEMA_LOCK_KEY}
+            ).scalar()
+            if got_lock:
+                try:
+                    Base.metadata.create_all(bind=engine)
+                finally:
+                    conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": SCHEMA_LOCK_KEY}
+                    )
+    # Start the AI request batcher
+    from app.services.ai_batcher import subject_line_batcher
+    subject_line_batcher.start()
     yield
     # Shutdown
+    await subject_line_batcher.stop()
+    from app.services.liqpay_service import LiqPayService
+    LiqPayService.close()
     logger.info("Shutting down...")
 
 app = FastAPI(
@@ -55,10 +89,67 @@ app.include_router(payments_liqpay.router, prefix="/api/v1/payments", tags=["Pay
 app.include_router(ai_router, prefix="/api/v1/ai", tags=["AI"])
 app.include_router(webhooks_liqpay.router, prefix="/api/v1/webhooks", tags=["Webhooks"])
 
+# Fan-out ceiling for the batch endpoint
+MAX_BATCH_SUBREQUESTS = 20
+_BATCH_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
+
+@app.post("/api/v1/batch")
+async def batch_requests(sub_requests: List[BatchSubRequest], request: Request):
+    """Dispatch several API calls over one HTTP round-trip.
+
+    Sub-requests run concurrently against the app itself over an ASGI
+    transport — no new sockets or TLS handshakes — so a dashboard load
+    that needs users + campaigns + analytics pays one round-trip instead
+    of one per call.
+    """
+    if len(sub_requests) > MAX_BATCH_SUBREQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_SUBREQUESTS} requests per batch"
+        )
+
+    headers = {}
+    authorization = request.headers.get("authorization")
+    if authorization:
+        headers["Authorization"] = authorization
+
+    async def dispatch(client, sub):
+        method = sub.method.upper()
+        if method not in _BATCH_METHODS:
+            return {"status": 405, "body": {"detail": "Method not allowed"}}
+        # Only API routes; nesting batches would allow amplification
+        if not sub.path.startswith("/api/v1/") or sub.path.startswith("/api/v1/batch"):
+            return {"status": 404, "body": {"detail": "Not found"}}
+        try:
+            response = await client.request(
+                method, sub.path, json=sub.body, headers=headers
+            )
+        except Exception:
+            logger.exception("Batch sub-request failed: %s %s", method, sub.path)
+            return {"status": 500, "body": {"detail": "Internal server error"}}
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        return {"status": response.status_code, "body": body}
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://batch"
+    ) as client:
+        results = await asyncio.gather(
+            *(dispatch(client, sub) for sub in sub_requests)
+        )
+
+    return results
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"Global exception: {exc}")
+    # exception() carries the traceback; method/path land as lazy args so
+    # nothing is formatted unless the record is actually emitted
+    logger.exception(
+        "Global exception on %s %s", request.method, request.url.path, exc_info=exc
+    )
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
@@ -67,9 +158,19 @@ async def global_exception_handler(request, exc):
 if __name__ == "__main__":
     import uvicorn
     import os
-    
+
     # Always use 8080 for Railway
     port = 8080
-    
+
     print(f"Starting server on port {port}")
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
+    # uvloop + httptools (bundled with uvicorn[standard]) roughly double
+    # request-parsing throughput; one worker per CPU
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=False,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count()
+    )
\ No newline at end of file
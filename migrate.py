@@ -23,7 +23,7 @@ def run_migration():
         return True
         
     except Exception as e:
-        logger.error(f"❌ Помилка міграції: {e}")
+        logger.error("❌ Помилка міграції: %s", e)
         return False
 
 if __name__ == "__main__":
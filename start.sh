@@ -4,7 +4,10 @@
 # Use PORT from environment or default to 8000
 PORT=${PORT:-8000}
 
-echo "Starting server on port $PORT"
+# One worker per CPU unless overridden
+WORKERS=${WEB_CONCURRENCY:-$(nproc)}
 
-# Run uvicorn with the correct port
-exec uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+echo "Starting server on port $PORT with $WORKERS workers"
+
+# Run uvicorn with uvloop + httptools (bundled with uvicorn[standard])
+exec uvicorn main:app --host 0.0.0.0 --port $PORT --workers $WORKERS --loop uvloop --http httptools
@@ -0,0 +1,58 @@
+import contextlib
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import get_password_hash
+from app.models.models import User
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager counting SQL statements issued through the sync engine.
+
+    Locks in the N+1 / round-trip ceilings: tests open the context around a
+    request and assert on the number of captured statements.
+    """
+    @contextlib.contextmanager
+    def _count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters,
+                                  context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return _count
+
+
+@pytest.fixture
+def seeded_user():
+    db = SessionLocal()
+    user = User(
+        email="query-count@test.local",
+        hashed_password=get_password_hash("test-password"),
+        is_active=True,
+        is_verified=True,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    try:
+        yield user
+    finally:
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
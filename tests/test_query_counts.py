@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from app.api.v1 import webhooks_liqpay
+from app.core.security import create_access_token
+
+client = TestClient(app)
+
+
+def auth_headers(user_id: int) -> dict:
+    token = create_access_token({"sub": str(user_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_get_me_query_ceiling(count_queries, seeded_user):
+    # At most the auth lookup + nothing else; a warm user cache drops
+    # this to zero, the ceiling covers the cold path
+    with count_queries() as statements:
+        response = client.get("/api/v1/users/me", headers=auth_headers(seeded_user.id))
+
+    assert response.status_code == 200
+    assert len(statements) <= 2
+
+
+def test_liqpay_webhook_is_queue_only(count_queries, monkeypatch):
+    # The webhook must acknowledge without touching Postgres; all DB work
+    # belongs to the process_liqpay_callback worker
+    monkeypatch.setattr(
+        webhooks_liqpay.process_liqpay_callback, "delay", lambda payload: None
+    )
+
+    liqpay = webhooks_liqpay.liqpay_service.liqpay
+    data = liqpay.cnb_data({"order_id": "test_order_1", "status": "success"})
+    signature = liqpay.str_to_sign(liqpay.private_key + data + liqpay.private_key)
+
+    with count_queries() as statements:
+        response = client.post(
+            "/api/v1/webhooks/liqpay",
+            data={"data": data, "signature": signature},
+        )
+
+    assert response.status_code == 200
+    assert len(statements) == 0